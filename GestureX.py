@@ -3,89 +3,3674 @@ Temple Run Body Controller - Single Press Mode
 Gesture executes ONCE - no continuous holding
 """
 
+import time
+STARTUP_TIME = time.perf_counter()
+
 import cv2
-import mediapipe as mp
 import numpy as np
-from pynput.keyboard import Controller, Key
-import time
 from collections import deque
-import tkinter as tk
-from PIL import Image, ImageTk
+from PIL import Image
 import threading
+import argparse
+import os
+import sys
+import json
+import socket
+import select
+import hashlib
+import base64
+import ast
+import io
+import math
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import queue
+import signal
+from multiprocessing import shared_memory
+
+# Tk is only needed for the window; --daemon and --replay run without it
+try:
+    import tkinter as tk
+    from PIL import ImageTk
+except ImportError:
+    tk = None
+    ImageTk = None
+
+# Rows and columns of the landmark arrays fed to LandmarkSmoother
+LEFT_WRIST, RIGHT_WRIST, SHOULDER_CENTER, HIP_CENTER = range(4)
+X, Y, Z, VISIBILITY = range(4)
+NUM_TRACKED_POINTS = 4
+
+# MediaPipe Pose landmark indices used by gesture detection
+POSE_LEFT_SHOULDER, POSE_RIGHT_SHOULDER = 11, 12
+POSE_LEFT_WRIST, POSE_RIGHT_WRIST = 15, 16
+POSE_LEFT_HIP, POSE_RIGHT_HIP = 23, 24
+NUM_POSE_LANDMARKS = 33
+
+
+# Binary landmark recording (.gxl): 16-byte header, the gesture name table, then fixed-size records
+RECORDING_MAGIC = b"GXLM"
+RECORDING_VERSION = 2
+RECORDING_HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("num_landmarks", "<u2"),
+    ("names_size", "<u4"),  # bytes of newline-separated gesture names after the header
+    ("reserved", "<u4")
+])
+RECORDING_RECORD = np.dtype([
+    ("capture_time", "<f8"),
+    ("inference_time", "<f8"),
+    ("landmarks", "<f4", (NUM_POSE_LANDMARKS, 4)),
+    ("gestures", "<u4")  # bit i set when the i-th gesture of the name table fired on this frame
+])
+# Version 1: no name table, one built-in gesture code per record (0 = none, 1 = JUMP, ...)
+RECORDING_RECORD_V1 = np.dtype([
+    ("capture_time", "<f8"),
+    ("inference_time", "<f8"),
+    ("landmarks", "<f4", (NUM_POSE_LANDMARKS, 4)),
+    ("gesture", "u1")
+])
+RECORDING_V1_GESTURES = ["JUMP", "SLIDE", "LEFT", "RIGHT"]
+# Gesture bitmasks (recordings, landmark packets, session log) are uint32
+MAX_GESTURES = 32
+
+
+LANDMARK_STREAM_EXTENSIONS = (".gxl", ".npy", ".npz")
+
+# Interpolation used when scaling the preview to the canvas
+DISPLAY_INTERPOLATION = {
+    "Fast": cv2.INTER_NEAREST,
+    "Linear": cv2.INTER_LINEAR,
+    "Area": cv2.INTER_AREA,
+    "Lanczos": cv2.INTER_LANCZOS4
+}
+
+
+# MediaPipe is imported on first use; it dominates startup time
+mediapipe = None
+
+
+def load_mediapipe():
+    global mediapipe
+    if mediapipe is None:
+        import mediapipe as mp
+        mediapipe = mp
+    return mediapipe
+
+
+def create_pose(model_complexity=1, static_image_mode=False):
+    """Build the MediaPipe Pose graph used by the live and headless pipelines"""
+    return load_mediapipe().solutions.pose.Pose(
+        static_image_mode=static_image_mode,
+        model_complexity=model_complexity,
+        smooth_landmarks=True,
+        enable_segmentation=False,
+        smooth_segmentation=False,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+class FrameGrabber:
+    """Dedicated camera reader that keeps only the newest frame (latest-frame-wins)
+
+    Frames are decoded in place into a ring of three buffers: one being
+    written, the newest waiting, and the one the consumer got from its last
+    read(), which stays valid until the next read().
+
+    With driver_timestamps, capture_time comes from the driver's buffer
+    timestamp (CLOCK_MONOTONIC on V4L2) instead of the moment read() returned,
+    so time spent queued inside the driver shows up as latency. The same
+    instant on time.perf_counter()'s monotonic clock is kept in capture_clock
+    for scheduling, which must not mix clocks.
+    """
+    def __init__(self, cap, driver_timestamps=False):
+        self.cap = cap
+        self.driver_timestamps = driver_timestamps
+        self.running = False
+        self.thread = None
+
+        # Frame ring shared with the consumer
+        self.frame_ready = threading.Condition()
+        self.buffers = [None, None, None]
+        self.ready_slot = -1
+        self.reading_slot = -1
+        self.capture_time = 0.0
+        self.capture_clock = 0.0
+        self.last_capture_clock = 0.0
+        self.driver_delay = 0.0
+        self.last_driver_delay = 0.0
+        self.sequence = 0
+        self.last_read_sequence = 0
+
+        # Statistics
+        self.grabbed_frames = 0
+        self.dropped_frames = 0
+        self.failed_reads = 0  # consecutive; a video file stays failing at its end
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.grab_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def grab_loop(self):
+        """Read frames as fast as the driver delivers them, overwriting the newest slot"""
+        while self.running:
+            if not self.grab():
+                time.sleep(0.005)
+
+    def grab(self):
+        """Decode one frame into a free ring slot; False if the camera returned nothing"""
+        with self.frame_ready:
+            slot = next(i for i in range(len(self.buffers)) if i != self.ready_slot and i != self.reading_slot)
+        buffer = self.buffers[slot]
+        ret, frame = self.cap.read(buffer) if buffer is not None else self.cap.read()
+        capture_time = time.time()
+        capture_clock = time.perf_counter()
+        if not ret:
+            self.failed_reads += 1
+            return False
+        self.failed_reads = 0
+        self.buffers[slot] = frame  # the same array unless the frame size changed
+
+        driver_delay = 0.0
+        if self.driver_timestamps:
+            age = time.monotonic() - self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if 0 <= age < 1.0:
+                driver_delay = age
+                capture_time -= age
+                capture_clock -= age
+
+        with self.frame_ready:
+            self.ready_slot = slot
+            self.capture_time = capture_time
+            self.capture_clock = capture_clock
+            self.driver_delay = driver_delay
+            self.sequence += 1
+            self.grabbed_frames += 1
+            self.frame_ready.notify()
+        return True
+
+    def read(self, timeout=0.5):
+        """Return (frame, capture_time) for the newest unseen frame, or (None, 0) on timeout"""
+        with self.frame_ready:
+            if not self.frame_ready.wait_for(
+                    lambda: self.sequence != self.last_read_sequence or not self.running,
+                    timeout=timeout):
+                return None, 0.0
+            if self.sequence == self.last_read_sequence:
+                return None, 0.0
+
+            # Every frame grabbed since the last read but never consumed was dropped
+            self.dropped_frames += self.sequence - self.last_read_sequence - 1
+            self.last_read_sequence = self.sequence
+            self.last_driver_delay = self.driver_delay
+            self.last_capture_clock = self.capture_clock
+            self.reading_slot, self.ready_slot = self.ready_slot, -1
+            return self.buffers[self.reading_slot], self.capture_time
+
+
+class VideoFileReader:
+    """FrameGrabber stand-in for a video file: every frame in order, paced at the file's FPS
+
+    Through the latest-frame-wins grabber a file decodes far faster than Pose
+    runs and almost every frame is dropped. Here read() decodes the next frame
+    synchronously; when processing is slower than the file, playback slows
+    down instead of skipping. read() returns (None, 0) only at the end.
+    """
+    def __init__(self, cap):
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.driver_timestamps = False
+        self.frame = None
+        self.start_clock = 0.0
+        self.last_capture_clock = 0.0
+        self.last_driver_delay = 0.0
+
+        # Statistics, as on FrameGrabber
+        self.grabbed_frames = 0
+        self.dropped_frames = 0
+        self.failed_reads = 0
+
+    def start(self):
+        self.start_clock = time.perf_counter()
+
+    def stop(self):
+        pass
+
+    def read(self, timeout=None):
+        """Return (frame, capture_time) for the next frame, or (None, 0) at the end of the file"""
+        delay = self.start_clock + self.grabbed_frames / self.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        ret, frame = self.cap.read(self.frame) if self.frame is not None else self.cap.read()
+        if not ret:
+            self.failed_reads += 1
+            return None, 0.0
+        self.frame = frame
+        self.grabbed_frames += 1
+        self.last_capture_clock = time.perf_counter()
+        return frame, time.time()
+
+
+class FrameBuffers:
+    """Preallocated images for the frame loop, written through OpenCV dst arguments
+
+    Display images are RGBA arrays wrapped once in PIL images that share their
+    memory, in a ring of three: the worker renders into a slot that is neither
+    the last published one nor the one Tk is pasting, so handing a frame to the
+    UI is an index swap under the lock instead of a copy.
+    """
+    def __init__(self):
+        self.mirrored = None
+        self.rgb = None
+        self.scaled = None
+        self.display = [None, None, None]  # (array, PIL image) per slot
+        self.published = -1
+        self.in_use = -1
+
+    def reset(self):
+        self.published = -1
+        self.in_use = -1
+
+    @staticmethod
+    def reuse(buffer, shape):
+        if buffer is None or buffer.shape != shape:
+            return np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def mirror(self, frame):
+        self.mirrored = self.reuse(self.mirrored, frame.shape)
+        return cv2.flip(frame, 1, dst=self.mirrored)
+
+    def to_rgb(self, frame):
+        self.rgb = self.reuse(self.rgb, frame.shape)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb)
+
+    def render(self, frame, size, interpolation):
+        """Scale a BGR frame to `size` into a free display slot and return the slot index"""
+        slot = next(i for i in range(len(self.display)) if i != self.published and i != self.in_use)
+        width, height = size
+        array, image = self.display[slot] or (None, None)
+        if array is None or array.shape[:2] != (height, width):
+            array = np.empty((height, width, 4), dtype=np.uint8)
+            image = Image.frombuffer("RGBA", size, array, "raw", "RGBA", 0, 1)
+            self.display[slot] = (array, image)
+
+        if frame.shape[:2] != (height, width):
+            self.scaled = self.reuse(self.scaled, (height, width, 3))
+            frame = cv2.resize(frame, size, dst=self.scaled, interpolation=interpolation)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=array)
+        return slot
+
+    def image(self, slot):
+        return self.display[slot][1]
+
+
+class LandmarkSmoother:
+    """Temporal landmark filter backed by a preallocated NumPy ring buffer
+
+    Modes:
+        moving_average - mean over the last `window` frames
+        exponential    - fixed-alpha exponential moving average
+        one_euro       - One Euro filter, cutoff rises with speed so fast moves lag less
+    """
+    MODES = ("moving_average", "exponential", "one_euro")
+
+    def __init__(self, num_points=NUM_TRACKED_POINTS, window=7, mode="moving_average",
+                 alpha=0.5, min_cutoff=1.0, beta=1.0, d_cutoff=1.0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+        self.mode = mode
+        self.window = window
+        self.alpha = alpha
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+
+        # Ring buffer of raw frames (frames x points x xyz+visibility) and their timestamps
+        self.buffer = np.zeros((window, num_points, 4), dtype=np.float64)
+        self.timestamps = np.zeros(window, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+
+        # Filter state, reused every frame
+        self.output = np.zeros((num_points, 4), dtype=np.float64)
+        self.derivative = np.zeros((num_points, 3), dtype=np.float64)
+        self.scratch = np.zeros((num_points, 3), dtype=np.float64)
+        self.cutoff = np.zeros((num_points, 3), dtype=np.float64)
+        self.last_timestamp = None
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.last_timestamp = None
+        self.derivative.fill(0)
+
+    def __len__(self):
+        return self.count
+
+    def set_mode(self, mode):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+        self.mode = mode
+        self.clear()
+
+    @staticmethod
+    def smoothing_factor(dt, cutoff):
+        tau = 1.0 / (2 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def update(self, points, timestamp):
+        """Push one frame of landmarks and return the filtered array
+
+        The returned array is owned by the smoother and overwritten on the next call.
+        """
+        self.buffer[self.head] = points
+        self.timestamps[self.head] = timestamp
+        self.head = (self.head + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+
+        if self.mode == "moving_average":
+            if self.count < 3:
+                return points
+            np.sum(self.buffer[:self.count, :, :3], axis=0, out=self.output[:, :3])
+            self.output[:, :3] /= self.count
+        elif self.last_timestamp is None:
+            self.output[:, :3] = points[:, :3]
+        elif self.mode == "exponential":
+            np.multiply(points[:, :3], self.alpha, out=self.scratch)
+            self.output[:, :3] *= 1.0 - self.alpha
+            self.output[:, :3] += self.scratch
+        else:
+            dt = max(timestamp - self.last_timestamp, 1e-3)
+
+            # Filtered speed of each coordinate
+            np.subtract(points[:, :3], self.output[:, :3], out=self.scratch)
+            self.scratch /= dt
+            a_d = self.smoothing_factor(dt, self.d_cutoff)
+            self.scratch *= a_d
+            self.derivative *= 1.0 - a_d
+            self.derivative += self.scratch
+
+            # Cutoff grows with speed: steady poses are smoothed hard, fast moves pass through
+            np.abs(self.derivative, out=self.cutoff)
+            self.cutoff *= self.beta
+            self.cutoff += self.min_cutoff
+            self.cutoff *= 2 * np.pi * dt
+            np.add(self.cutoff, 1.0, out=self.scratch)
+            np.divide(self.cutoff, self.scratch, out=self.cutoff)
+
+            np.subtract(points[:, :3], self.output[:, :3], out=self.scratch)
+            self.scratch *= self.cutoff
+            self.output[:, :3] += self.scratch
+
+        self.last_timestamp = timestamp
+        self.output[:, VISIBILITY] = points[:, VISIBILITY]
+        return self.output
+
+
+class LatencyTracker:
+    """Rolling per-stage latency histograms with CSV / Prometheus text export
+
+    Stages are measured from the camera capture timestamp of each frame;
+    `keypress` is capture -> key sent for frames that fired a gesture and
+    `key_queue` is the time a key event waited for the output thread.
+    """
+    STAGES = ("driver", "queue", "preprocess", "inference", "detect", "render", "total", "key_queue", "keypress")
+    BUCKETS_MS = (2, 5, 10, 20, 33, 50, 75, 100, 150, 250, 500, 1000)
+
+    def __init__(self, window=512):
+        self.window = window
+        self.stage_index = {stage: i for i, stage in enumerate(self.STAGES)}
+        self.lock = threading.Lock()
+
+        # Recent samples for percentiles, plus cumulative histogram for export
+        self.samples = np.zeros((len(self.STAGES), window), dtype=np.float64)
+        self.counts = np.zeros(len(self.STAGES), dtype=np.int64)
+        self.sums = np.zeros(len(self.STAGES), dtype=np.float64)
+        self.bucket_counts = np.zeros((len(self.STAGES), len(self.BUCKETS_MS) + 1), dtype=np.int64)
+        self.counters = {}
+
+        self.export_path = None
+        self.export_interval = 5.0
+        self.export_thread = None
+        self.exporting = False
+
+    def record(self, stage, seconds):
+        i = self.stage_index[stage]
+        ms = seconds * 1000
+        with self.lock:
+            self.samples[i, self.counts[i] % self.window] = ms
+            self.counts[i] += 1
+            self.sums[i] += ms
+            self.bucket_counts[i, bisect_left(self.BUCKETS_MS, ms)] += 1
+
+    def set_counter(self, name, value):
+        """Publish a monotonically increasing counter alongside the histograms"""
+        self.counters[name] = value
+
+    def summary(self):
+        """Return {stage: {count, mean, p50, p95, p99}} in milliseconds for stages with data"""
+        result = {}
+        with self.lock:
+            for stage, i in self.stage_index.items():
+                count = int(self.counts[i])
+                if count == 0:
+                    continue
+                recent = self.samples[i, :min(count, self.window)]
+                p50, p95, p99 = np.percentile(recent, (50, 95, 99))
+                result[stage] = {
+                    "count": count,
+                    "mean": float(self.sums[i] / count),
+                    "p50": float(p50),
+                    "p95": float(p95),
+                    "p99": float(p99)
+                }
+        return result
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP gesturex_stage_latency_ms Time from camera capture to the end of each pipeline stage",
+            "# TYPE gesturex_stage_latency_ms histogram"
+        ]
+        with self.lock:
+            for stage, i in self.stage_index.items():
+                cumulative = np.cumsum(self.bucket_counts[i])
+                for le, count in zip(self.BUCKETS_MS, cumulative):
+                    lines.append(f'gesturex_stage_latency_ms_bucket{{stage="{stage}",le="{le}"}} {count}')
+                lines.append(f'gesturex_stage_latency_ms_bucket{{stage="{stage}",le="+Inf"}} {cumulative[-1]}')
+                lines.append(f'gesturex_stage_latency_ms_sum{{stage="{stage}"}} {self.sums[i]:.3f}')
+                lines.append(f'gesturex_stage_latency_ms_count{{stage="{stage}"}} {self.counts[i]}')
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE gesturex_{name} counter")
+            lines.append(f"gesturex_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Append a CSV snapshot (.csv) or rewrite a Prometheus text file (anything else)"""
+        if path.endswith(".csv"):
+            new_file = not os.path.exists(path)
+            now = time.time()
+            with open(path, "a") as f:
+                if new_file:
+                    f.write("timestamp,stage,count,mean_ms,p50_ms,p95_ms,p99_ms\n")
+                for stage, stats in self.summary().items():
+                    f.write(f"{now:.3f},{stage},{stats['count']},{stats['mean']:.3f},"
+                            f"{stats['p50']:.3f},{stats['p95']:.3f},{stats['p99']:.3f}\n")
+        else:
+            # Write then rename so a scraper never sees a half-written file
+            temp_path = path + ".tmp"
+            with open(temp_path, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(temp_path, path)
+
+    def start_export(self, path, interval=5.0):
+        self.export_path = path
+        self.export_interval = interval
+        self.exporting = True
+        self.export_thread = threading.Thread(target=self.export_loop, daemon=True)
+        self.export_thread.start()
+
+    def stop_export(self):
+        self.exporting = False
+        if self.export_thread is not None:
+            self.export_thread.join(timeout=1.0)
+            self.export_thread = None
+            self.export(self.export_path)
+
+    def export_loop(self):
+        while self.exporting:
+            time.sleep(self.export_interval)
+            try:
+                self.export(self.export_path)
+            except OSError as e:
+                print(f"Metrics export error: {e}")
+
+
+# Per-frame detection state kept by SessionLog, in column order
+SESSION_LOG_FEATURES = ("left_wrist_rise", "right_wrist_rise", "left_wrist_drop", "right_wrist_drop",
+                        "lean", "body_angle", "compression_ratio", "jump_progress", "slide_progress",
+                        "jump_confidence", "slide_confidence")
+# Frame status in the session log; frames without any pose are not logged
+LOG_LOST, LOG_CALIBRATING, LOG_DETECTING = 1, 2, 3
+# Key outcome in the session log
+KEY_DROPPED, KEY_FAILED, KEY_SENT = -1, 0, 1
+
+
+class SessionLog:
+    """Fixed-size ring of per-frame detection state, for finding out why a gesture was missed
+
+    Everything is preallocated: a frame writes one row of float32 features,
+    its status and three rule bitmasks (held, fired, blocked by cooldown);
+    key output results go to a second, smaller ring. dump() writes both in
+    order to an .npz file that report.py analyses offline.
+    """
+    def __init__(self, frames=18000, keys=2048):
+        self.times = np.zeros((frames, 2), dtype=np.float64)           # capture, detection done
+        self.status = np.zeros(frames, dtype=np.uint8)
+        self.features = np.full((frames, len(SESSION_LOG_FEATURES)), np.nan, dtype=np.float32)
+        self.flags = np.zeros((frames, 3), dtype=np.uint32)            # held, fired, blocked
+        self.count = 0
+
+        self.key_times = np.zeros((keys, 2), dtype=np.float64)         # capture, sent
+        self.key_info = np.zeros((keys, 2), dtype=np.int16)            # rule index, outcome
+        self.key_count = 0
+
+        self.rules = None
+        self.rule_index = {}
+
+    def record(self, timestamp, status, engine=None, features=None, fired=()):
+        """Log one frame; `features` is None until the player is calibrated"""
+        i = self.count % len(self.status)
+        self.times[i, 0] = timestamp
+        self.times[i, 1] = time.time()
+        self.status[i] = status
+        row = self.features[i]
+        flags = self.flags[i]
+        if features is None:
+            row.fill(np.nan)
+            flags.fill(0)
+        else:
+            for j, name in enumerate(SESSION_LOG_FEATURES):
+                row[j] = features[name]
+            if engine.rules is not self.rules:
+                self.rules = engine.rules
+                self.rule_index = {rule.name: k for k, rule in enumerate(engine.rules)}
+            index = self.rule_index
+            held = 0
+            for name, active in engine.active.items():
+                if active:
+                    held |= 1 << index[name]
+            flags[0] = held
+            flags[1] = sum(1 << index[rule.name] for rule in fired)
+            flags[2] = sum(1 << index[rule.name] for rule in engine.blocked)
+        self.count += 1
+
+    def record_key(self, gesture, capture_time, sent_time, outcome):
+        i = self.key_count % len(self.key_info)
+        self.key_times[i, 0] = capture_time
+        self.key_times[i, 1] = sent_time
+        self.key_info[i, 0] = self.rule_index.get(gesture, -1)
+        self.key_info[i, 1] = outcome
+        self.key_count += 1
+
+    @staticmethod
+    def ordered(count, size):
+        """Ring indices oldest first; the two oldest rows are skipped once wrapped, as they may be rewritten while copying"""
+        n = min(count, size - 2)
+        return np.arange(count - n, count) % size
+
+    def dump(self, path, metadata=None):
+        """Write the logged frames and key results, oldest first, to an .npz file"""
+        frames = self.ordered(self.count, len(self.status))
+        keys = self.ordered(self.key_count, len(self.key_info))
+        info = {
+            "features": list(SESSION_LOG_FEATURES),
+            "rules": [rule.name for rule in self.rules] if self.rules else [],
+            "frames_logged": self.count,
+            "keys_logged": self.key_count,
+            "dumped": time.strftime("%Y-%m-%d %H:%M:%S"),
+            **(metadata or {})
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, times=self.times[frames], status=self.status[frames],
+                 features=self.features[frames], flags=self.flags[frames],
+                 key_times=self.key_times[keys], key_info=self.key_info[keys],
+                 metadata=np.array(json.dumps(info)))
+        os.replace(temp_path, path)
+        return path
+
+
+class NullSink:
+    """Key sink that discards every gesture"""
+    def emit(self, gesture, key, timestamp):
+        pass
+
+
+class RecordingSink:
+    """Key sink that records (timestamp, gesture, key) instead of pressing keys
+
+    With a path, every event is also appended to that file as a CSV line.
+    """
+    def __init__(self, path=None):
+        self.events = []
+        self.file = open(path, "a") if path else None
+        self.session_log = None  # replays log key results here; there is no send time to measure
+
+    def emit(self, gesture, key, timestamp):
+        self.events.append((timestamp, gesture, key))
+        if self.file:
+            self.file.write(f"{timestamp:.6f},{gesture},{key}\n")
+            self.file.flush()
+        if self.session_log is not None:
+            self.session_log.record_key(gesture, timestamp, timestamp, KEY_SENT)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class KeyboardSink:
+    """Key sink that presses and releases keys through pynput
+
+    Keys are pynput Key names ("up", "space", "f5") or single characters.
+    """
+    def __init__(self):
+        from pynput.keyboard import Controller, Key
+        self.keyboard = Controller()
+        self.key_type = Key
+        self.keys = {}
+
+    def emit(self, gesture, key, timestamp):
+        resolved = self.keys.get(key)
+        if resolved is None:
+            resolved = self.keys[key] = getattr(self.key_type, key, key)
+        self.keyboard.press(resolved)
+        self.keyboard.release(resolved)
+
+
+class SocketSink:
+    """Key sink that sends each gesture as a JSON datagram to a local UDP port"""
+    def __init__(self, host="127.0.0.1", port=5555):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def emit(self, gesture, key, timestamp):
+        message = json.dumps({"gesture": gesture, "key": key, "timestamp": timestamp})
+        self.sock.sendto(message.encode(), self.address)
+
+    def close(self):
+        self.sock.close()
+
+
+KEY_BACKENDS = ("pynput", "null", "record", "socket")
+
+
+def create_key_backend(name, target=None):
+    """Build a key sink by name; `target` is the events file (record) or HOST:PORT (socket)"""
+    if name == "pynput":
+        return KeyboardSink()
+    if name == "null":
+        return NullSink()
+    if name == "record":
+        return RecordingSink(target)
+    if name == "socket":
+        host, _, port = (target or "127.0.0.1:5555").rpartition(":")
+        return SocketSink(host or "127.0.0.1", int(port))
+    raise ValueError(f"Unknown key backend: {name}")
+
+
+class KeyEmitter:
+    """Queues gesture keys and sends them from a dedicated output thread
+
+    Detection only enqueues, so a slow or blocked backend can never stall the
+    frame loop. The output thread measures how long events waited and counts
+    send failures instead of hiding them.
+    """
+    def __init__(self, backend, latency_tracker=None, max_queue=64):
+        self.backend = backend
+        self.latency_tracker = latency_tracker
+        self.events = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.stopping = threading.Event()
+        self.session_log = None  # optional SessionLog, told how every key ended
+
+        # Statistics
+        self.sent = 0
+        self.send_failures = 0
+        self.dropped = 0
+        self.last_error = None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.output_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """Send what is queued within `timeout`, then give up; never waits on a stuck backend"""
+        if self.thread is not None:
+            self.stopping.set()
+            try:
+                self.events.put_nowait(None)
+            except queue.Full:
+                pass  # the output thread also notices the stop flag once the queue is empty
+            self.thread.join(timeout=timeout)
+            self.thread = None
+            # Whatever the backend did not get to is lost
+            while True:
+                try:
+                    event = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                if event is not None:
+                    self.dropped += 1
+                    if self.session_log is not None:
+                        self.session_log.record_key(event[0], event[2], math.nan, KEY_DROPPED)
+        if hasattr(self.backend, "close"):
+            self.backend.close()
+
+    def emit(self, gesture, key, timestamp):
+        try:
+            self.events.put_nowait((gesture, key, timestamp, time.time()))
+        except queue.Full:
+            self.dropped += 1
+            if self.session_log is not None:
+                self.session_log.record_key(gesture, timestamp, math.nan, KEY_DROPPED)
+
+    def output_loop(self):
+        tracker = self.latency_tracker
+        while True:
+            try:
+                event = self.events.get(timeout=0.1)
+            except queue.Empty:
+                if self.stopping.is_set():
+                    break
+                continue
+            if event is None:
+                break
+            gesture, key, timestamp, queued_time = event
+
+            send_time = time.time()
+            try:
+                self.backend.emit(gesture, key, timestamp)
+            except Exception as e:
+                self.send_failures += 1
+                self.last_error = str(e)
+                print(f"Key output error ({gesture} -> {key}): {e}")
+                outcome = KEY_FAILED
+            else:
+                self.sent += 1
+                if tracker is not None:
+                    tracker.record("keypress", time.time() - timestamp)
+                outcome = KEY_SENT
+            if self.session_log is not None:
+                self.session_log.record_key(gesture, timestamp, time.time(), outcome)
+
+            if tracker is not None:
+                tracker.record("key_queue", send_time - queued_time)
+                tracker.set_counter("key_send_failures_total", self.send_failures)
+
+
+# Local event server: gesture events as JSON, per-frame landmarks as binary packets
+EVENT_TRANSPORTS = ("udp", "unix", "ws")
+LANDMARK_PACKET_MAGIC = b"GXLP"
+LANDMARK_PACKET = np.dtype([
+    ("magic", "S4"),
+    ("sequence", "<u4"),
+    ("record", RECORDING_RECORD)
+])
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def parse_event_address(url):
+    """Split udp://HOST:PORT, unix:///path or ws://HOST:PORT into (transport, address)"""
+    transport, separator, rest = url.partition("://")
+    if not separator or transport not in EVENT_TRANSPORTS:
+        raise ValueError(f"Event address must start with udp://, unix:// or ws://: {url}")
+    if transport == "unix":
+        return transport, rest
+    host, _, port = rest.rstrip("/").rpartition(":")
+    return transport, (host or "127.0.0.1", int(port))
+
+
+def websocket_frame(payload, binary):
+    """Unmasked, unfragmented server-to-client WebSocket frame"""
+    header = bytearray([0x82 if binary else 0x81])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 65536:
+        header.append(126)
+        header += length.to_bytes(2, "big")
+    else:
+        header.append(127)
+        header += length.to_bytes(8, "big")
+    return bytes(header) + payload
+
+
+def decode_event_packet(payload, gestures=()):
+    """Turn a received payload back into a dict (landmarks as a (33, 4) array)
+
+    `gestures` is the name table from the server's hello message; it turns a
+    landmark packet's gesture bitmask back into names.
+    """
+    if payload[:4] == LANDMARK_PACKET_MAGIC:
+        packet = np.frombuffer(payload, dtype=LANDMARK_PACKET, count=1)[0]
+        record = packet["record"]
+        return {
+            "type": "landmarks",
+            "sequence": int(packet["sequence"]),
+            "capture_time": float(record["capture_time"]),
+            "inference_time": float(record["inference_time"]),
+            "gesture_mask": int(record["gestures"]),
+            "gestures": gesture_names_in(int(record["gestures"]), gestures),
+            "landmarks": record["landmarks"].copy()
+        }
+    return json.loads(payload)
+
+
+class EventClientConnection:
+    """Server-side state of one subscriber"""
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.buffer = bytearray()
+        self.dropped = 0
+        self.last_seen = time.time()
+
+
+class EventServer:
+    """Publishes gesture events and landmark packets to local subscribers
+
+    Publishing only encodes the packet and appends it to an outbox, so
+    capture_loop never waits on a client. A sender thread fans packets out over
+    non-blocking sockets. Each stream client has a bounded buffer: a client
+    that falls behind loses landmark packets (gesture events are kept) and is
+    disconnected if even those back up. Every packet carries a sequence number,
+    so clients can count what they missed.
+
+    New subscribers first get an unsequenced hello message naming the
+    gestures, in the order of the bits in each landmark packet's gesture mask.
+
+    udp:  clients subscribe by sending any datagram ("bye" to leave) and repeat
+          it within udp_timeout seconds; each packet is one datagram
+    unix: stream clients; each packet is prefixed with its 4-byte little-endian length
+    ws:   WebSocket clients; gesture events are text frames, landmarks binary frames
+    """
+    def __init__(self, url, max_pending=256 * 1024, udp_timeout=10.0, max_outbox=1024):
+        self.url = url
+        self.transport, self.address = parse_event_address(url)
+        self.max_pending = max_pending
+        self.udp_timeout = udp_timeout
+
+        self.sequence = 0
+        self.sequence_lock = threading.Lock()
+        # Gesture events are never dropped here; landmark packets beyond max_outbox are
+        self.events = deque()
+        self.outbox = deque()
+        self.max_outbox = max_outbox
+        self.handshakes = queue.Queue()
+        self.clients = {}
+        self.packet = np.zeros(1, dtype=LANDMARK_PACKET)
+        self.packet["magic"] = LANDMARK_PACKET_MAGIC
+        self.gestures = []  # names behind the landmark packets' gesture bitmask, set before start()
+
+        # Statistics
+        self.published = 0
+        self.dropped = 0
+        self.outbox_dropped = 0  # landmark packets the sender thread fell too far behind on
+        self.disconnects = 0
+
+        self.sock = None
+        self.running = False
+        self.thread = None
+        self.wakeup_receive, self.wakeup_send = socket.socketpair()
+        self.wakeup_receive.setblocking(False)
+        self.wakeup_send.setblocking(False)
+
+    def start(self):
+        if self.transport == "udp":
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(self.address)
+        elif self.transport == "unix":
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.address)
+            sock.listen(8)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(self.address)
+            sock.listen(8)
+        sock.setblocking(False)
+        self.sock = sock
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        for client in list(self.clients.values()):
+            if client.sock is not None:
+                client.sock.close()
+        self.clients.clear()
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            if self.transport == "unix" and os.path.exists(self.address):
+                os.unlink(self.address)
+        self.wakeup_receive.close()
+        self.wakeup_send.close()
+
+    def wake(self):
+        try:
+            self.wakeup_send.send(b"\0")
+        except OSError:
+            pass  # already pending, or stopped
+
+    def next_sequence(self):
+        with self.sequence_lock:
+            self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+            return self.sequence
+
+    def emit(self, gesture, key, timestamp):
+        """Key sink interface: publish a gesture event"""
+        if not self.running:
+            return
+        sequence = self.next_sequence()
+        message = {"type": "gesture", "sequence": sequence, "timestamp": timestamp,
+                   "gesture": gesture, "key": key}
+        self.events.append((sequence, True, json.dumps(message).encode()))
+        self.wake()
+
+    def publish_landmarks(self, landmarks, capture_time, inference_time, gestures=()):
+        """Publish one frame; `landmarks` is MediaPipe output, a (33, 4) array, or None
+
+        `gestures` are the names of the gestures fired on the frame.
+        """
+        if not self.running or not self.clients:
+            return
+        packet = self.packet[0]
+        sequence = self.next_sequence()
+        packet["sequence"] = sequence
+        mask = gesture_mask(self.gestures, gestures) if gestures else 0
+        fill_recording_record(packet["record"], landmarks, capture_time, inference_time, mask)
+        if len(self.outbox) >= self.max_outbox:
+            try:
+                self.outbox.popleft()
+                self.outbox_dropped += 1
+            except IndexError:
+                pass  # the sender thread just emptied it
+        self.outbox.append((sequence, False, self.packet.tobytes()))
+        self.wake()
+
+    def serve(self):
+        """Sender thread: accept subscribers and fan out the outbox"""
+        while self.running:
+            writers = [c.sock for c in self.clients.values() if c.sock is not None and c.buffer]
+            try:
+                readable, writable, _ = select.select([self.sock, self.wakeup_receive], writers, [], 0.5)
+            except (OSError, ValueError) as e:
+                print(f"Event server error: {e}")
+                continue
+
+            if self.wakeup_receive in readable:
+                try:
+                    while self.wakeup_receive.recv(4096):
+                        pass
+                except BlockingIOError:
+                    pass
+            if self.sock in readable:
+                self.accept()
+            while not self.handshakes.empty():
+                sock, address = self.handshakes.get_nowait()
+                self.clients[sock] = client = EventClientConnection(sock, address)
+                self.greet(client)
+
+            self.fan_out()
+            for sock in writable:
+                client = self.clients.get(sock)
+                if client is not None:
+                    self.flush(client)
+
+            if self.transport == "udp":
+                now = time.time()
+                for address, client in list(self.clients.items()):
+                    if now - client.last_seen > self.udp_timeout:
+                        del self.clients[address]
+
+    def accept(self):
+        if self.transport == "udp":
+            while True:
+                try:
+                    data, address = self.sock.recvfrom(1024)
+                except BlockingIOError:
+                    return
+                except OSError:
+                    continue  # ICMP error from a client that went away
+                if data.strip() == b"bye":
+                    self.clients.pop(address, None)
+                    continue
+                if address in self.clients:
+                    self.clients[address].last_seen = time.time()
+                else:
+                    self.clients[address] = EventClientConnection(None, address)
+                # Answered on every refresh, so a lost hello datagram is made up for
+                self.greet(self.clients[address])
+            return
+
+        try:
+            sock, address = self.sock.accept()
+        except BlockingIOError:
+            return
+        if self.transport == "unix":
+            sock.setblocking(False)
+            self.clients[sock] = client = EventClientConnection(sock, address or self.address)
+            self.greet(client)
+        else:
+            # The HTTP upgrade runs on its own thread so a slow client cannot hold up the others
+            threading.Thread(target=self.websocket_handshake, args=(sock, address), daemon=True).start()
+
+    def websocket_handshake(self, sock, address):
+        try:
+            sock.settimeout(2.0)
+            request = b""
+            while b"\r\n\r\n" not in request:
+                chunk = sock.recv(4096)
+                if not chunk or len(request) > 8192:
+                    raise ConnectionError("incomplete WebSocket handshake")
+                request += chunk
+            key = None
+            for line in request.decode("latin-1").split("\r\n")[1:]:
+                name, _, value = line.partition(":")
+                if name.strip().lower() == "sec-websocket-key":
+                    key = value.strip()
+            if key is None:
+                raise ConnectionError("missing Sec-WebSocket-Key")
+            accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+            sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                          "Upgrade: websocket\r\n"
+                          "Connection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            sock.setblocking(False)
+            self.handshakes.put((sock, address))
+            self.wake()
+        except Exception as e:
+            print(f"Event server handshake error ({address}): {e}")
+            sock.close()
+
+    def greet(self, client):
+        """Send a new subscriber the gesture names behind the landmark packets' bitmask"""
+        payload = json.dumps({"type": "hello", "gestures": list(self.gestures)}).encode()
+        if self.transport == "udp":
+            try:
+                self.sock.sendto(payload, client.address)
+            except OSError:
+                pass  # the next refresh asks again
+            return
+        client.buffer += self.frame(payload, binary=False)
+        self.flush(client)
+
+    def frame(self, payload, binary):
+        """Stream framing: length prefix for unix sockets, a WebSocket frame for ws"""
+        if self.transport == "unix":
+            return len(payload).to_bytes(4, "little") + payload
+        return websocket_frame(payload, binary)
+
+    def next_packet(self):
+        """Oldest pending packet across both queues, so sequence numbers go out in order"""
+        events, outbox = self.events, self.outbox
+        try:
+            if events and (not outbox or events[0][0] < outbox[0][0]):
+                return events.popleft()
+            return outbox.popleft()
+        except IndexError:
+            return None
+
+    def fan_out(self):
+        while True:
+            packet = self.next_packet()
+            if packet is None:
+                break
+            _, is_event, payload = packet
+            self.published += 1
+
+            if self.transport == "udp":
+                for address, client in list(self.clients.items()):
+                    try:
+                        self.sock.sendto(payload, address)
+                    except BlockingIOError:
+                        client.dropped += 1
+                        self.dropped += 1
+                    except OSError:
+                        del self.clients[address]
+                continue
+
+            data = self.frame(payload, binary=not is_event)
+            for client in list(self.clients.values()):
+                pending = len(client.buffer)
+                if pending > self.max_pending:
+                    if not is_event:
+                        client.dropped += 1
+                        self.dropped += 1
+                        continue
+                    if pending > 4 * self.max_pending:
+                        print(f"Event client {client.address} disconnected: too far behind")
+                        self.disconnect(client)
+                        continue
+                client.buffer += data
+                self.flush(client)
+
+    def flush(self, client):
+        try:
+            sent = client.sock.send(client.buffer)
+            del client.buffer[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.disconnect(client)
+
+    def disconnect(self, client):
+        self.clients.pop(client.sock, None)
+        client.sock.close()
+        self.disconnects += 1
+
+    def status(self):
+        return (f"{self.transport} clients: {len(self.clients)} | published: {self.published} | "
+                f"dropped: {self.dropped} | outbox dropped: {self.outbox_dropped}")
+
+
+class EventClient:
+    """Minimal subscriber for EventServer: a stand-in for overlays and loggers, and for testing"""
+    def __init__(self, url, timeout=1.0):
+        self.transport, address = parse_event_address(url)
+        self.buffer = bytearray()
+        self.gestures = []  # from the server's hello message
+        if self.transport == "udp":
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.connect(address)
+            self.subscribe()
+        elif self.transport == "unix":
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address)
+        else:
+            self.sock = socket.create_connection(address, timeout=timeout)
+            key = base64.b64encode(os.urandom(16)).decode()
+            self.sock.sendall((f"GET / HTTP/1.1\r\nHost: {address[0]}:{address[1]}\r\n"
+                               "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                               f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+            while b"\r\n\r\n" not in self.buffer:
+                chunk = self.sock.recv(4096)
+                if not chunk:
+                    raise ConnectionError("server closed during WebSocket handshake")
+                self.buffer += chunk
+            response, _, rest = bytes(self.buffer).partition(b"\r\n\r\n")
+            if b" 101 " not in response.split(b"\r\n")[0]:
+                raise ConnectionError(f"WebSocket upgrade refused: {response.splitlines()[0]!r}")
+            self.buffer = bytearray(rest)
+        self.sock.settimeout(timeout)
+
+    def subscribe(self):
+        self.sock.send(b"subscribe")
+        self.subscribed = time.time()
+
+    def close(self):
+        if self.transport == "udp":
+            try:
+                self.sock.send(b"bye")
+            except OSError:
+                pass
+        self.sock.close()
+
+    def fill(self, size):
+        while len(self.buffer) < size:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("event server closed the connection")
+            self.buffer += chunk
+
+    def take(self, start, end):
+        payload = bytes(self.buffer[start:end])
+        del self.buffer[:end]
+        return payload
+
+    def receive(self):
+        """Return the next packet as a dict, or None on timeout"""
+        try:
+            if self.transport == "udp":
+                if time.time() - self.subscribed > 2.0:
+                    self.subscribe()
+                return self.decode(self.sock.recv(65536))
+            if self.transport == "unix":
+                self.fill(4)
+                length = int.from_bytes(self.buffer[:4], "little")
+                self.fill(4 + length)
+                return self.decode(self.take(4, 4 + length))
+
+            self.fill(2)
+            opcode, length = self.buffer[0] & 0x0F, self.buffer[1] & 0x7F
+            header = 2
+            if length == 126:
+                self.fill(4)
+                length, header = int.from_bytes(self.buffer[2:4], "big"), 4
+            elif length == 127:
+                self.fill(10)
+                length, header = int.from_bytes(self.buffer[2:10], "big"), 10
+            self.fill(header + length)
+            payload = self.take(header, header + length)
+            if opcode == 0x8:
+                raise ConnectionError("event server closed the connection")
+            return self.decode(payload)
+        except socket.timeout:
+            return None
+
+    def decode(self, payload):
+        packet = decode_event_packet(payload, self.gestures)
+        if packet["type"] == "hello":
+            self.gestures = packet["gestures"]
+        return packet
+
+
+class MotionPredictor:
+    """Fits velocity and acceleration to recent gesture progress for early triggers
+
+    Inputs are normalized progress signals (1.0 = the gesture's threshold)
+    computed from raw, unsmoothed landmarks with their capture timestamps. A
+    quadratic least-squares fit over the last few samples gives the current
+    rate and acceleration. Once a gesture is `min_progress` of the way there,
+    its confidence is how far the trajectory projected `horizon` seconds ahead
+    reaches the threshold, scaled down when the motion is slower than
+    `min_rate` thresholds per second.
+    """
+    SIGNALS = ("jump", "slide")
+
+    def __init__(self, history=5):
+        self.history = history
+        self.times = np.zeros(history, dtype=np.float64)
+        self.values = np.zeros((history, len(self.SIGNALS)), dtype=np.float64)
+        self.count = 0
+        self.latest = 0
+        self.rate = np.zeros(len(self.SIGNALS))
+        self.acceleration = np.zeros(len(self.SIGNALS))
+        self.confidence = dict.fromkeys(self.SIGNALS, 0.0)
+
+    def clear(self):
+        self.count = 0
+        self.rate[:] = 0
+        self.acceleration[:] = 0
+        for name in self.confidence:
+            self.confidence[name] = 0.0
+
+    def update(self, t, progress, horizon, min_rate, min_progress):
+        """Add one sample of progress values (ordered like SIGNALS) and refresh confidences"""
+        if self.count and t <= self.times[self.latest]:
+            return self.confidence
+        self.latest = (self.latest + 1) % self.history if self.count else 0
+        self.times[self.latest] = t
+        self.values[self.latest] = progress
+        self.count = min(self.count + 1, self.history)
+        if self.count < 3:
+            return self.confidence
+
+        # Quadratic fit around the newest sample: value = c0 + c1*dt + c2*dt^2
+        dt = self.times[:self.count] - t
+        design = np.stack((np.ones_like(dt), dt, dt * dt), axis=1)
+        coefficients = np.linalg.lstsq(design, self.values[:self.count], rcond=None)[0]
+        self.rate[:] = coefficients[1]
+        self.acceleration[:] = 2 * coefficients[2]
+
+        for i, name in enumerate(self.SIGNALS):
+            rate = self.rate[i]
+            if rate <= 0 or progress[i] < min_progress:
+                self.confidence[name] = 0.0
+                continue
+            # Only extrapolate forward while still moving toward the threshold
+            acceleration = max(self.acceleration[i], -rate / horizon)
+            projected = progress[i] + rate * horizon + 0.5 * acceleration * horizon * horizon
+            self.confidence[name] = float(min(max(projected, 0.0), 1.0) * min(rate / min_rate, 1.0))
+        return self.confidence
+
+
+# Tunable detector attributes (sliders, rule files, profiles)
+TUNABLE_PARAMETERS = ("jump_threshold", "slide_single_hand_threshold", "slide_body_angle",
+                      "tilt_sensitivity", "cooldown_time")
+
+# Per-frame features available to gesture rule expressions
+GESTURE_FEATURES = (
+    "left_wrist_rise",         # shoulder center y - left wrist y (positive = above shoulders)
+    "right_wrist_rise",
+    "left_wrist_drop",         # left wrist y - hip center y (positive = below hips)
+    "right_wrist_drop",
+    "left_wrist_visibility",
+    "right_wrist_visibility",
+    "body_angle",              # forward bend in degrees
+    "compression_ratio",       # shoulder-hip distance / calibrated distance
+    "lean",                    # shoulder center x - calibrated neutral x
+    "jump_progress",           # min wrist rise / jump_threshold (1.0 = at threshold)
+    "slide_progress",          # strongest slide condition relative to its threshold
+    "jump_confidence",         # predictive trigger confidence, 0 when prediction is off
+    "slide_confidence",
+    "jump_rate",               # fitted jump progress per second (raw landmarks), 0 when prediction is off
+    "slide_rate",
+    "predictive"               # whether predictive triggering is enabled
+)
+
+# Built-in rules, equivalent to the original hand-written checks. Rules without
+# a "cooldown" use the Cooldown slider, but each gesture has its own timer.
+DEFAULT_GESTURE_RULES = {
+    "parameters": {
+        "compression_threshold": 0.85,
+        "min_wrist_visibility": 0.4,
+        "tilt_release_margin": 0.02,
+        "predict_confidence": 0.8,
+        "predict_horizon": 0.12,
+        "predict_min_rate": 4.0,
+        "predict_min_progress": 0.5
+    },
+    "gestures": [
+        {
+            "name": "JUMP",
+            "key": "up",
+            "trigger": "(left_wrist_rise > jump_threshold and right_wrist_rise > jump_threshold"
+                       " or jump_confidence >= predict_confidence)"
+                       " and min(left_wrist_visibility, right_wrist_visibility) > min_wrist_visibility",
+            "release": "(jump_progress < predict_min_progress and jump_rate <= 0 if predictive else jump_progress <= 1)"
+                       " or min(left_wrist_visibility, right_wrist_visibility) <= min_wrist_visibility",
+            "confidence": "max(jump_confidence, min(jump_progress, 1))"
+        },
+        {
+            "name": "SLIDE",
+            "key": "down",
+            "trigger": "(left_wrist_visibility > min_wrist_visibility and left_wrist_drop > slide_single_hand_threshold)"
+                       " or (right_wrist_visibility > min_wrist_visibility and right_wrist_drop > slide_single_hand_threshold)"
+                       " or body_angle > slide_body_angle or compression_ratio < compression_threshold"
+                       " or slide_confidence >= predict_confidence",
+            "release": "slide_progress < predict_min_progress and slide_rate <= 0 if predictive else slide_progress <= 1",
+            "confidence": "max(slide_confidence, min(slide_progress, 1))"
+        },
+        {
+            "name": "LEFT",
+            "key": "left",
+            "trigger": "lean < -tilt_sensitivity",
+            "release": "lean > -tilt_sensitivity + tilt_release_margin"
+        },
+        {
+            "name": "RIGHT",
+            "key": "right",
+            "trigger": "lean > tilt_sensitivity",
+            "release": "lean < tilt_sensitivity - tilt_release_margin"
+        }
+    ]
+}
+
+# Syntax and functions allowed in rule expressions
+RULE_NODES = (ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call,
+              ast.Name, ast.Load, ast.Constant, ast.And, ast.Or, ast.Not, ast.Add, ast.Sub,
+              ast.Mult, ast.Div, ast.USub, ast.UAdd, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+              ast.Eq, ast.NotEq, ast.IfExp)
+RULE_FUNCTIONS = {"min": min, "max": max, "abs": abs, "sqrt": math.sqrt}
+
+
+def compile_rule_expression(source, names):
+    """Compile a rule expression after checking it only uses allowed syntax and known names"""
+    tree = ast.parse(source, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, RULE_NODES):
+            raise ValueError(f"Unsupported syntax in rule expression: {source!r}")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in RULE_FUNCTIONS):
+            raise ValueError(f"Only {', '.join(RULE_FUNCTIONS)} can be called in rule expressions: {source!r}")
+        if isinstance(node, ast.Name) and node.id not in names and node.id not in RULE_FUNCTIONS:
+            raise ValueError(f"Unknown name {node.id!r} in rule expression: {source!r}")
+    return compile(tree, "<gesture rule>", "eval")
+
+
+def read_config_file(path):
+    """Parse a JSON file, or YAML (.yaml/.yml) when PyYAML is installed"""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required for YAML config files (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class GestureRule:
+    """One compiled gesture definition"""
+    def __init__(self, name, key, trigger, release=None, cooldown=None, confidence=None):
+        self.name = name
+        self.key = key
+        self.trigger = trigger
+        self.release = release
+        self.cooldown = cooldown
+        self.confidence = confidence
+
+
+class GestureRuleEngine:
+    """Evaluates every gesture rule on a shared feature vector each frame
+
+    A rule fires once when its trigger becomes true, then stays active until
+    its release expression (default: trigger false) holds. Cooldowns are per
+    gesture, so a JUMP never delays a lane change.
+    """
+    def __init__(self, rules, parameters=None):
+        self.rules = rules
+        self.parameters = dict(parameters or {})
+        self.active = {rule.name: False for rule in rules}
+        self.last_fired = {rule.name: -math.inf for rule in rules}
+        self.cooldown_blocks = {rule.name: 0 for rule in rules}
+        self.blocked = []  # rules held back by their cooldown on the last frame
+        self.confidence = {rule.name: 0.0 for rule in rules}
+        self.globals = {"__builtins__": {}, **RULE_FUNCTIONS}
+
+    @classmethod
+    def from_dict(cls, data):
+        parameters = data.get("parameters", {})
+        names = set(GESTURE_FEATURES) | set(TUNABLE_PARAMETERS) | set(parameters)
+        rules = []
+        for definition in data["gestures"]:
+            release = definition.get("release")
+            confidence = definition.get("confidence")
+            rules.append(GestureRule(
+                name=definition["name"],
+                key=definition["key"],
+                trigger=compile_rule_expression(definition["trigger"], names),
+                release=compile_rule_expression(release, names) if release else None,
+                cooldown=definition.get("cooldown"),
+                confidence=compile_rule_expression(confidence, names) if confidence else None
+            ))
+        if len({rule.name for rule in rules}) != len(rules):
+            raise ValueError("Gesture rule names must be unique")
+        if len(rules) > MAX_GESTURES:
+            raise ValueError(f"At most {MAX_GESTURES} gesture rules are supported")
+        return cls(rules, parameters)
+
+    @classmethod
+    def load(cls, path):
+        """Load rules from a JSON file, or YAML (.yaml/.yml) when PyYAML is installed"""
+        return cls.from_dict(read_config_file(path))
+
+    def reset(self):
+        for name in self.active:
+            self.active[name] = False
+
+    def evaluate(self, namespace, now, default_cooldown):
+        """Update rule states for one frame and return the rules that fired"""
+        fired = []
+        blocked = self.blocked
+        blocked.clear()
+        for rule in self.rules:
+            if not self.active[rule.name]:
+                if eval(rule.trigger, self.globals, namespace):
+                    cooldown = default_cooldown if rule.cooldown is None else rule.cooldown
+                    if now - self.last_fired[rule.name] >= cooldown:
+                        self.active[rule.name] = True
+                        self.last_fired[rule.name] = now
+                        if rule.confidence is not None:
+                            self.confidence[rule.name] = eval(rule.confidence, self.globals, namespace)
+                        else:
+                            self.confidence[rule.name] = 1.0
+                        fired.append(rule)
+                    else:
+                        self.cooldown_blocks[rule.name] += 1
+                        blocked.append(rule)
+            else:
+                if rule.release is not None:
+                    released = eval(rule.release, self.globals, namespace)
+                else:
+                    released = not eval(rule.trigger, self.globals, namespace)
+                if released:
+                    self.active[rule.name] = False
+        return fired
+
+
+class RunningStats:
+    """Welford running mean and variance of a small fixed-size vector"""
+    def __init__(self, size):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.delta = np.zeros(size)
+
+    def clear(self):
+        self.count = 0
+        self.mean[:] = 0
+        self.m2[:] = 0
+
+    def add(self, values):
+        self.count += 1
+        np.subtract(values, self.mean, out=self.delta)
+        self.mean += self.delta / self.count
+        self.m2 += self.delta * (values - self.mean)
+
+    def std(self):
+        if self.count < 2:
+            return np.full_like(self.mean, np.inf)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+
+# Per-user calibration profiles (neutral pose + tuned thresholds)
+CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".gesturex")
+PROFILE_DIR = os.path.join(CONFIG_DIR, "profiles")
+SESSION_LOG_DIR = os.path.join(CONFIG_DIR, "logs")
+
+
+def calibration_profile_path(name):
+    """Profile names map to PROFILE_DIR/<name>.json; paths ending in .json are used as-is"""
+    if name.endswith(".json"):
+        return name
+    return os.path.join(PROFILE_DIR, f"{name}.json")
+
+
+def session_log_path(target=None):
+    """Session log dumps: a .npz path is used as-is, otherwise a timestamped file in that directory"""
+    if target and target.endswith(".npz"):
+        return target
+    return os.path.join(target or SESSION_LOG_DIR, time.strftime("session-%Y%m%d-%H%M%S.npz"))
+
+
+class GestureDetector:
+    """Calibration, smoothing and single-press gesture logic, independent of the UI"""
+    def __init__(self, key_sink=None, rules=None, predictive=False):
+        # Key output (queued emitter in the app, null/recording sinks when headless)
+        self.key_sink = key_sink if key_sink is not None else NullSink()
+        self.key_failures = 0
+        self.event_sink = None  # optional EventServer, also told about every gesture
+        self.session_log = None  # optional SessionLog of every frame's detection state
+
+        # Gesture detection parameters
+        self.jump_threshold = 0.15
+        self.slide_single_hand_threshold = 0.12
+        self.slide_body_angle = 20
+        self.tilt_sensitivity = 0.08
+        self.cooldown_time = 0.5  # Default per-gesture cooldown for single press
+
+        # Table-driven gesture rules
+        self.rule_engine = None
+        self.parameters = {}
+        self.set_rules(rules if rules is not None else GestureRuleEngine.from_dict(DEFAULT_GESTURE_RULES))
+
+        # Calibration: running statistics until the neutral pose is steady
+        self.neutral_center_x = None
+        self.neutral_shoulder_hip_distance = None
+        self.calibration = RunningStats(2)
+        self.calibration_sample = np.zeros(2)
+        self.calibration_min_frames = 10
+        self.calibration_max_frames = 90
+        self.calibration_center_tolerance = 0.006   # std of shoulder center x
+        self.calibration_distance_tolerance = 0.02  # std of shoulder-hip distance, relative
+        # Slow drift tracking of the neutral pose while IDLE
+        self.drift_time_constant = 20.0
+        self.drift_time = None
+        self.landmark_buffer = LandmarkSmoother(window=7, mode="moving_average")
+        self.raw_points = np.zeros((NUM_TRACKED_POINTS, 4), dtype=np.float64)
+
+        # Velocity-based early triggering on raw landmarks (optional)
+        self.predictor = MotionPredictor()
+        self.predictive = predictive
+        self.progress = np.zeros(len(MotionPredictor.SIGNALS))
+        self.confidence = 0.0
+        self.fired = ()  # names of the gestures fired on the last frame
+
+        # Feature vector shared by all rules, reused every frame
+        self.features = {}
+
+    @property
+    def gesture_names(self):
+        """Gesture names in rule order: bit i of a recorded gesture mask is gesture_names[i]"""
+        return [rule.name for rule in self.rule_engine.rules]
+
+    @property
+    def gesture_states(self):
+        """Whether each gesture is currently held (prevents continuous trigger)"""
+        return self.rule_engine.active
+
+    def set_rules(self, rule_engine):
+        """Install a compiled rule set; its parameters override the defaults"""
+        self.rule_engine = rule_engine
+        self.parameters = {}
+        self.apply_parameters(rule_engine.parameters)
+        self.gesture_count = {rule.name: 0 for rule in rule_engine.rules}
+
+    def apply_parameters(self, parameters):
+        # slide_progress and drift tracking scale by 1 - compression_threshold
+        threshold = parameters.get("compression_threshold")
+        if threshold is not None and not 0 <= threshold < 1:
+            raise ValueError(f"compression_threshold must be in [0, 1), got {threshold}")
+        for name, value in parameters.items():
+            if name in TUNABLE_PARAMETERS:
+                setattr(self, name, value)
+            else:
+                self.parameters[name] = value
+
+    def reset_calibration(self):
+        """Forget the neutral pose and smoothing history"""
+        self.neutral_center_x = None
+        self.neutral_shoulder_hip_distance = None
+        self.calibration.clear()
+        self.drift_time = None
+        self.landmark_buffer.clear()
+        self.predictor.clear()
+
+    @property
+    def calibrated(self):
+        return self.neutral_center_x is not None and self.neutral_shoulder_hip_distance is not None
+
+    def save_profile(self, path):
+        """Write the neutral pose and current thresholds to a JSON profile"""
+        if not self.calibrated:
+            return False
+        profile = {
+            "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "neutral_center_x": float(self.neutral_center_x),
+            "neutral_shoulder_hip_distance": float(self.neutral_shoulder_hip_distance),
+            "parameters": {name: getattr(self, name) for name in TUNABLE_PARAMETERS}
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(profile, f, indent=2)
+        os.replace(temp_path, path)
+        return True
+
+    def load_profile(self, path):
+        """Restore a saved profile so detection starts on the first frame"""
+        with open(path) as f:
+            profile = json.load(f)
+        self.reset_calibration()
+        self.neutral_center_x = profile.get("neutral_center_x")
+        self.neutral_shoulder_hip_distance = profile.get("neutral_shoulder_hip_distance")
+        self.apply_parameters(profile.get("parameters", {}))
+
+    def reset_counter(self):
+        self.gesture_count = {name: 0 for name in self.gesture_count}
+
+    def dump_session_log(self, path, **metadata):
+        """Write the session log together with the cooldowns and thresholds in effect"""
+        rules = self.rule_engine.rules
+        return self.session_log.dump(path, {
+            "rules": [rule.name for rule in rules],
+            "cooldowns": {rule.name: self.cooldown_time if rule.cooldown is None else rule.cooldown
+                          for rule in rules},
+            "parameters": dict({name: getattr(self, name) for name in TUNABLE_PARAMETERS}, **self.parameters),
+            "predictive": self.predictive,
+            **metadata
+        })
+
+    def emit_key(self, gesture, key, timestamp):
+        """Send the key bound to a gesture to the configured sink"""
+        try:
+            if self.event_sink is not None:
+                self.event_sink.emit(gesture, key, timestamp)
+            self.key_sink.emit(gesture, key, timestamp)
+        except Exception as e:
+            self.key_failures += 1
+            print(f"Key output error ({gesture}): {e}")
+
+    def smooth_landmarks(self, points, timestamp):
+        """Apply temporal smoothing with the selected filter"""
+        return self.landmark_buffer.update(points, timestamp)
+
+    def slide_progress(self, left_drop, right_drop, body_angle, compression_ratio):
+        """Strongest slide condition as a fraction of its threshold"""
+        compression_threshold = self.parameters.get("compression_threshold", 0.85)
+        return max(left_drop / self.slide_single_hand_threshold,
+                   right_drop / self.slide_single_hand_threshold,
+                   body_angle / self.slide_body_angle,
+                   (1 - compression_ratio) / (1 - compression_threshold))
+
+    def calibrate_neutral_position(self, body_center_x, shoulder_hip_dist):
+        """Calibrate the neutral body position once its variance settles"""
+        if self.calibrated:
+            return
+        stats = self.calibration
+        self.calibration_sample[0] = body_center_x
+        self.calibration_sample[1] = shoulder_hip_dist
+        stats.add(self.calibration_sample)
+        if stats.count < self.calibration_min_frames:
+            return
+
+        std = stats.std()
+        if (std[0] <= self.calibration_center_tolerance and
+                std[1] <= self.calibration_distance_tolerance * stats.mean[1]):
+            self.neutral_center_x = float(stats.mean[0])
+            self.neutral_shoulder_hip_distance = float(stats.mean[1])
+            stats.clear()
+        elif stats.count >= self.calibration_max_frames:
+            # Player still moving: start over rather than average the motion
+            stats.clear()
+
+    def track_drift(self, body_center_x, shoulder_hip_dist, timestamp):
+        """Let the neutral pose follow slow position changes while no gesture is held"""
+        previous, self.drift_time = self.drift_time, timestamp
+        if previous is None or any(self.rule_engine.active.values()):
+            return
+        if abs(body_center_x - self.neutral_center_x) > self.tilt_sensitivity / 2:
+            return
+        ratio = shoulder_hip_dist / self.neutral_shoulder_hip_distance
+        if abs(1 - ratio) > (1 - self.parameters.get("compression_threshold", 0.85)) / 2:
+            return
+        alpha = 1 - np.exp(-min(timestamp - previous, 0.5) / self.drift_time_constant)
+        self.neutral_center_x += alpha * (body_center_x - self.neutral_center_x)
+        self.neutral_shoulder_hip_distance += alpha * (shoulder_hip_dist - self.neutral_shoulder_hip_distance)
+
+    def calculate_body_angle(self, shoulder_y, hip_y, shoulder_z, hip_z):
+        """Calculate body forward bend angle"""
+        vertical_dist = abs(hip_y - shoulder_y)
+        depth_dist = abs(hip_z - shoulder_z)
+
+        if vertical_dist > 0.01:
+            angle = np.degrees(np.arctan(depth_dist / vertical_dist))
+            return angle
+        return 0
+
+    def detect_gesture(self, landmarks, timestamp=None):
+        """Enhanced gesture detection with single press logic
+
+        `timestamp` defaults to the wall clock; replays pass the recorded time
+        so cooldowns behave the same as in the live session.
+        """
+        current_time = time.time() if timestamp is None else timestamp
+        log = self.session_log
+        self.fired = ()
+        try:
+            # Extract key landmarks
+            left_wrist = landmarks[POSE_LEFT_WRIST]
+            right_wrist = landmarks[POSE_RIGHT_WRIST]
+            left_shoulder = landmarks[POSE_LEFT_SHOULDER]
+            right_shoulder = landmarks[POSE_RIGHT_SHOULDER]
+            left_hip = landmarks[POSE_LEFT_HIP]
+            right_hip = landmarks[POSE_RIGHT_HIP]
+
+            if (left_shoulder.visibility < 0.3 or right_shoulder.visibility < 0.3 or
+                left_hip.visibility < 0.3 or right_hip.visibility < 0.3):
+                # Reset all gesture states when pose not detected
+                self.rule_engine.reset()
+                self.predictor.clear()
+                if log is not None:
+                    log.record(current_time, LOG_LOST)
+                return "IDLE", 0
+
+            # Calculate key positions
+            shoulder_center_y = (left_shoulder.y + right_shoulder.y) / 2
+            shoulder_center_z = (left_shoulder.z + right_shoulder.z) / 2
+            hip_center_y = (left_hip.y + right_hip.y) / 2
+            hip_center_z = (left_hip.z + right_hip.z) / 2
+            hip_y = hip_center_y
+            body_center_x = (left_shoulder.x + right_shoulder.x) / 2
+
+            shoulder_hip_distance = np.sqrt(
+                (shoulder_center_y - hip_center_y)**2 +
+                (shoulder_center_z - hip_center_z)**2
+            )
+
+            body_angle = self.calculate_body_angle(shoulder_center_y, hip_center_y,
+                                                   shoulder_center_z, hip_center_z)
+
+            # Smooth landmarks
+            points = self.raw_points
+            points[LEFT_WRIST] = (left_wrist.x, left_wrist.y, left_wrist.z, left_wrist.visibility)
+            points[RIGHT_WRIST] = (right_wrist.x, right_wrist.y, right_wrist.z, right_wrist.visibility)
+            points[SHOULDER_CENTER] = (body_center_x, shoulder_center_y, shoulder_center_z, 1.0)
+            points[HIP_CENTER] = (body_center_x, hip_y, hip_center_z, 1.0)
+            smoothed = self.smooth_landmarks(points, current_time)
+
+            self.calibrate_neutral_position(smoothed[SHOULDER_CENTER, X], shoulder_hip_distance)
+
+            if not self.calibrated:
+                if log is not None:
+                    log.record(current_time, LOG_CALIBRATING)
+                return "CALIBRATING", body_angle
+
+            # Shared feature vector, plus every tunable parameter, for rule expressions
+            features = self.features
+            features["left_wrist_rise"] = smoothed[SHOULDER_CENTER, Y] - smoothed[LEFT_WRIST, Y]
+            features["right_wrist_rise"] = smoothed[SHOULDER_CENTER, Y] - smoothed[RIGHT_WRIST, Y]
+            features["left_wrist_drop"] = smoothed[LEFT_WRIST, Y] - smoothed[HIP_CENTER, Y]
+            features["right_wrist_drop"] = smoothed[RIGHT_WRIST, Y] - smoothed[HIP_CENTER, Y]
+            features["left_wrist_visibility"] = left_wrist.visibility
+            features["right_wrist_visibility"] = right_wrist.visibility
+            features["body_angle"] = body_angle
+            features["compression_ratio"] = shoulder_hip_distance / self.neutral_shoulder_hip_distance
+            features["lean"] = smoothed[SHOULDER_CENTER, X] - self.neutral_center_x
+            features["jump_progress"] = min(features["left_wrist_rise"], features["right_wrist_rise"]) / self.jump_threshold
+            min_visibility = self.parameters.get("min_wrist_visibility", 0.4)
+            features["slide_progress"] = self.slide_progress(
+                features["left_wrist_drop"] if left_wrist.visibility > min_visibility else 0.0,
+                features["right_wrist_drop"] if right_wrist.visibility > min_visibility else 0.0,
+                body_angle, features["compression_ratio"])
+            features["predictive"] = self.predictive
+            for name in TUNABLE_PARAMETERS:
+                features[name] = getattr(self, name)
+            features.update(self.parameters)
+
+            if self.predictive:
+                # Same progress signals from the raw landmarks: no smoothing lag
+                progress = self.progress
+                left_drop = left_wrist.y - hip_y if left_wrist.visibility > min_visibility else 0.0
+                right_drop = right_wrist.y - hip_y if right_wrist.visibility > min_visibility else 0.0
+                progress[0] = min(shoulder_center_y - left_wrist.y, shoulder_center_y - right_wrist.y) / self.jump_threshold
+                progress[1] = self.slide_progress(left_drop, right_drop, body_angle,
+                                                  shoulder_hip_distance / self.neutral_shoulder_hip_distance)
+                confidence = self.predictor.update(current_time, progress,
+                                                   self.parameters.get("predict_horizon", 0.12),
+                                                   self.parameters.get("predict_min_rate", 4.0),
+                                                   self.parameters.get("predict_min_progress", 0.5))
+                features["jump_confidence"] = confidence["jump"]
+                features["slide_confidence"] = confidence["slide"]
+                features["jump_rate"] = self.predictor.rate[0]
+                features["slide_rate"] = self.predictor.rate[1]
+            else:
+                features["jump_confidence"] = 0.0
+                features["slide_confidence"] = 0.0
+                features["jump_rate"] = 0.0
+                features["slide_rate"] = 0.0
+
+            fired = self.rule_engine.evaluate(features, current_time, self.cooldown_time)
+            if log is not None:
+                log.record(current_time, LOG_DETECTING, self.rule_engine, features, fired)
+            for rule in fired:
+                self.gesture_count[rule.name] += 1
+                self.emit_key(rule.name, rule.key, current_time)
+            if fired:
+                self.fired = [rule.name for rule in fired]
+
+            # Rules are listed in priority order; show the first that fired
+            if fired:
+                self.confidence = self.rule_engine.confidence[fired[0].name]
+                return fired[0].name, body_angle
+            self.track_drift(smoothed[SHOULDER_CENTER, X], shoulder_hip_distance, current_time)
+            return "IDLE", body_angle
+
+        except Exception as e:
+            print(f"Gesture detection error: {e}")
+            return "ERROR", 0
+
+
+class Landmark:
+    """Lightweight stand-in for a MediaPipe landmark, used when replaying arrays"""
+    __slots__ = ("x", "y", "z", "visibility")
+
+    def __init__(self, x, y, z, visibility):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visibility = visibility
+
+
+def landmarks_to_array(landmarks, out=None):
+    """Copy MediaPipe landmarks into a (33, 4) float32 array of x, y, z, visibility"""
+    if out is None:
+        out = np.empty((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+    for i, lm in enumerate(landmarks):
+        out[i] = (lm.x, lm.y, lm.z, lm.visibility)
+    return out
+
+
+def landmarks_from_array(array):
+    """Wrap a (33, 4) landmark array so detect_gesture can read it like MediaPipe output"""
+    return [Landmark(float(x), float(y), float(z), float(v)) for x, y, z, v in array]
+
+
+def landmark_list_from_array(array):
+    """Build the protobuf NormalizedLandmarkList that draw_landmarks expects"""
+    from mediapipe.framework.formats import landmark_pb2
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in array:
+        landmark_list.landmark.add(x=float(x), y=float(y), z=float(z), visibility=float(visibility))
+    return landmark_list
+
+
+def gesture_mask(names, gestures):
+    """Bitmask with bit i set for each of `gestures` that is names[i]; other names are ignored"""
+    mask = 0
+    for gesture in gestures:
+        if gesture in names:
+            mask |= 1 << names.index(gesture)
+    return mask
+
+
+def gesture_names_in(mask, names):
+    """The names whose bits are set in a gesture bitmask"""
+    return [name for i, name in enumerate(names) if mask >> i & 1]
+
+
+def fill_recording_record(record, landmarks, capture_time, inference_time, gestures=0):
+    """Fill one RECORDING_RECORD in place; `landmarks` is MediaPipe output, a (33, 4) array, or None
+
+    `gestures` is the bitmask of gestures fired on the frame.
+    """
+    record["capture_time"] = capture_time
+    record["inference_time"] = inference_time
+    if landmarks is None:
+        record["landmarks"] = np.nan
+    elif isinstance(landmarks, np.ndarray):
+        record["landmarks"] = landmarks
+    else:
+        landmarks_to_array(landmarks, out=record["landmarks"])
+    record["gestures"] = gestures
+
+
+class LandmarkRecorder:
+    """Append-only writer for .gxl landmark recordings
+
+    Each frame is one fixed-size record, so a crash loses at most the frame
+    being written and playback never has to parse anything. `gestures` is the
+    name table written to the header; each record flags which of them fired.
+    """
+    def __init__(self, path, gestures=()):
+        self.path = path
+        self.gestures = list(gestures)
+        if len(self.gestures) > MAX_GESTURES:
+            raise ValueError(f"At most {MAX_GESTURES} gestures fit in a recording")
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            names, offset, record = read_recording_header(path)
+            if record is not RECORDING_RECORD:
+                raise ValueError(f"{path} is an older landmark recording; record to a new file")
+            if names != self.gestures:
+                raise ValueError(f"{path} was recorded with gestures {', '.join(names) or 'none'}; "
+                                 f"record {', '.join(self.gestures) or 'none'} to a new file")
+            # A crash can leave half a record at the end; appending after it would misalign every later record
+            with open(path, "r+b") as f:
+                f.truncate(offset + recording_frames(path) * RECORDING_RECORD.itemsize)
+        self.file = open(path, "ab")
+        if new_file:
+            table = "\n".join(self.gestures).encode()
+            table += b"\0" * (-len(table) % 8)  # keep records 8-byte aligned
+            header = np.zeros(1, dtype=RECORDING_HEADER)
+            header["magic"] = RECORDING_MAGIC
+            header["version"] = RECORDING_VERSION
+            header["num_landmarks"] = NUM_POSE_LANDMARKS
+            header["names_size"] = len(table)
+            self.file.write(header.tobytes() + table)
+            # On disk right away: a run interrupted before the first flush must not leave a file without a header
+            self.file.flush()
+
+        self.record = np.zeros(1, dtype=RECORDING_RECORD)
+        self.frames = 0
+
+    def write(self, landmarks, capture_time, inference_time, gestures=()):
+        """Append one frame; `landmarks` is MediaPipe output, a (33, 4) array, or None
+
+        `gestures` are the names of the gestures fired on the frame.
+        """
+        mask = gesture_mask(self.gestures, gestures) if gestures else 0
+        fill_recording_record(self.record[0], landmarks, capture_time, inference_time, mask)
+        self.file.write(self.record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def read_recording_header(path):
+    """(gesture names, offset of the first record, record dtype) of a .gxl recording
+
+    Version 1 recordings have no name table; they store RECORDING_RECORD_V1
+    with a built-in gesture code instead of a bitmask.
+    """
+    header = np.fromfile(path, dtype=RECORDING_HEADER, count=1)
+    if len(header) == 0 or header["magic"][0] != RECORDING_MAGIC:
+        raise ValueError(f"Not a landmark recording: {path}")
+    version = header["version"][0]
+    if version not in (1, RECORDING_VERSION) or header["num_landmarks"][0] != NUM_POSE_LANDMARKS:
+        raise ValueError(f"Unsupported landmark recording version in {path}")
+    if version == 1:
+        return list(RECORDING_V1_GESTURES), RECORDING_HEADER.itemsize, RECORDING_RECORD_V1
+
+    size = int(header["names_size"][0])
+    with open(path, "rb") as f:
+        f.seek(RECORDING_HEADER.itemsize)
+        table = f.read(size)
+    if len(table) != size:
+        raise ValueError(f"Truncated landmark recording header in {path}")
+    table = table.rstrip(b"\0").decode()
+    return table.split("\n") if table else [], RECORDING_HEADER.itemsize + size, RECORDING_RECORD
+
+
+def recording_frames(path):
+    """Whole records in a .gxl file; a partially written trailing record does not count"""
+    _, offset, record = read_recording_header(path)
+    return max(os.path.getsize(path) - offset, 0) // record.itemsize
+
+
+def open_landmark_recording(path):
+    """Memory-map a .gxl recording as a structured array of RECORDING_RECORD
+
+    Nothing is read up front; slicing only touches the pages it needs. A
+    partially written trailing record is ignored. The gesture names behind
+    the `gestures` bitmask come from read_recording_header.
+    """
+    _, offset, record = read_recording_header(path)
+    frames = max(os.path.getsize(path) - offset, 0) // record.itemsize
+    if frames == 0:
+        return np.zeros(0, dtype=record)
+    return np.memmap(path, dtype=record, mode="r", offset=offset, shape=(frames,))
+
+
+def load_landmark_stream(path, fps=30.0):
+    """Load recorded landmarks as (landmarks[N, 33, 4], timestamps[N])
+
+    Accepts a .gxl recording, a .npy array (timestamps assumed at `fps`) or
+    a .npz holding `landmarks` and `timestamps`. Frames without a pose are NaN.
+    """
+    if path.endswith(".gxl"):
+        records = open_landmark_recording(path)
+        landmarks = records["landmarks"]
+        timestamps = records["capture_time"]
+    elif path.endswith(".npz"):
+        data = np.load(path)
+        landmarks = data["landmarks"]
+        timestamps = data["timestamps"] if "timestamps" in data else np.arange(len(landmarks)) / fps
+    else:
+        landmarks = np.load(path, mmap_mode="r")
+        timestamps = np.arange(len(landmarks)) / fps
+    if landmarks.ndim != 3 or landmarks.shape[1:] != (NUM_POSE_LANDMARKS, 4):
+        raise ValueError(f"Expected landmarks of shape (N, {NUM_POSE_LANDMARKS}, 4), got {landmarks.shape}")
+    return landmarks, timestamps
+
+
+class HeadlessPipeline:
+    """Runs pose -> detect_gesture -> key emission without Tk or a webcam
+
+    Frames are processed as fast as the CPU allows; timestamps come from the
+    recording, so cooldowns behave as they did in the original session.
+    """
+    def __init__(self, detector, model_complexity=1, mirror=True):
+        self.detector = detector
+        self.model_complexity = model_complexity
+        self.mirror = mirror
+        self.pose = None
+
+    def close(self):
+        if self.pose:
+            self.pose.close()
+            self.pose = None
+
+    def run_video(self, path, max_frames=None):
+        """Replay a video file through pose inference and gesture detection"""
+        if self.pose is None:
+            self.pose = create_pose(self.model_complexity)
+
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+        frames = 0
+        pose_frames = 0
+        start_time = time.perf_counter()
+        try:
+            while max_frames is None or frames < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                if self.mirror:
+                    frame = cv2.flip(frame, 1)
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                results = self.pose.process(rgb_frame)
+
+                if results.pose_landmarks:
+                    pose_frames += 1
+                    self.detector.detect_gesture(results.pose_landmarks.landmark, frames / fps)
+                frames += 1
+        finally:
+            cap.release()
+
+        return self.summary(frames, pose_frames, time.perf_counter() - start_time)
+
+    def run_landmarks(self, path, max_frames=None):
+        """Replay a recorded landmark stream, skipping pose inference entirely"""
+        landmarks, timestamps = load_landmark_stream(path)
+        if max_frames is not None:
+            landmarks, timestamps = landmarks[:max_frames], timestamps[:max_frames]
+
+        pose_frames = 0
+        start_time = time.perf_counter()
+        for frame, timestamp in zip(landmarks, timestamps):
+            if np.isnan(frame[0, 0]):
+                continue
+            pose_frames += 1
+            self.detector.detect_gesture(landmarks_from_array(frame), float(timestamp))
+
+        return self.summary(len(landmarks), pose_frames, time.perf_counter() - start_time)
+
+    def run(self, path, max_frames=None):
+        if path.endswith(LANDMARK_STREAM_EXTENSIONS):
+            return self.run_landmarks(path, max_frames)
+        return self.run_video(path, max_frames)
+
+    def summary(self, frames, pose_frames, elapsed):
+        return {
+            "frames": frames,
+            "pose_frames": pose_frames,
+            "elapsed": elapsed,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "gesture_count": dict(self.detector.gesture_count)
+        }
+
+
+class PoseRegionTracker:
+    """Crops Pose.process input to a padded box around the player and scales it to a latency target
+
+    The box comes from the previous frame's landmarks and only moves when the
+    player leaves it, so MediaPipe's own tracking sees a stable image. When
+    tracking is lost the full frame is used again.
+    """
+    def __init__(self, padding=0.25, min_size=0.35, target_latency=0.033,
+                 min_scale=0.4, max_scale=1.0):
+        self.enabled = True
+        self.padding = padding
+        self.min_size = min_size
+        self.target_latency = target_latency
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+
+        self.scale = max_scale
+        self.region = None  # (x0, y0, x1, y1) normalized, None means full frame
+        self.buffer = None  # reused Pose input when cropping or scaling
+        self.average_latency = None
+        self.frames_since_scale_change = 0
+
+    def reset(self):
+        self.region = None
+        self.scale = self.max_scale
+        self.average_latency = None
+
+    def prepare(self, rgb_frame):
+        """Return (image for Pose.process, crop as normalized (x, y, w, h))"""
+        height, width = rgb_frame.shape[:2]
+        if self.enabled and self.region is not None:
+            x0, y0, x1, y1 = self.region
+            px0, py0 = int(x0 * width), int(y0 * height)
+            px1, py1 = int(x1 * width), int(y1 * height)
+            image = rgb_frame[py0:py1, px0:px1]
+        else:
+            px0, py0, px1, py1 = 0, 0, width, height
+            image = rgb_frame
+        crop = (px0 / width, py0 / height, (px1 - px0) / width, (py1 - py0) / height)
+
+        if self.enabled and self.scale < 0.99:
+            size = (max(int((px1 - px0) * self.scale), 64), max(int((py1 - py0) * self.scale), 64))
+            self.buffer = FrameBuffers.reuse(self.buffer, (size[1], size[0], 3))
+            image = cv2.resize(image, size, dst=self.buffer, interpolation=cv2.INTER_AREA)
+        elif image is not rgb_frame:
+            self.buffer = FrameBuffers.reuse(self.buffer, image.shape)
+            np.copyto(self.buffer, image)
+            image = self.buffer
+        return image, crop
+
+    def update(self, results, crop, latency):
+        """Map landmarks back to full-frame coordinates and pick the next region and scale"""
+        self.adapt_scale(latency)
+
+        if not results.pose_landmarks:
+            self.region = None
+            return
+
+        landmarks = results.pose_landmarks.landmark
+        crop_x, crop_y, crop_w, crop_h = crop
+        if crop_w < 1.0 or crop_h < 1.0:
+            for lm in landmarks:
+                lm.x = crop_x + lm.x * crop_w
+                lm.y = crop_y + lm.y * crop_h
+                lm.z = lm.z * crop_w
+
+        if not self.enabled:
+            self.region = None
+            return
+
+        visible = [(lm.x, lm.y) for lm in landmarks if lm.visibility > 0.5]
+        if len(visible) < 4:
+            self.region = None
+            return
+
+        xs, ys = zip(*visible)
+        left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+
+        # Keep the current box while the player stays inside it and fills a reasonable part of it
+        if self.region is not None:
+            x0, y0, x1, y1 = self.region
+            inside = left > x0 and right < x1 and top > y0 and bottom < y1
+            box_area = (x1 - x0) * (y1 - y0)
+            player_area = (right - left) * (bottom - top)
+            if inside and player_area > 0.2 * box_area:
+                return
+
+        pad_x = max((right - left) * self.padding, (self.min_size - (right - left)) / 2)
+        pad_y = max((bottom - top) * self.padding, (self.min_size - (bottom - top)) / 2)
+        x0, x1 = max(0.0, left - pad_x), min(1.0, right + pad_x)
+        y0, y1 = max(0.0, top - pad_y), min(1.0, bottom + pad_y)
+        self.region = None if (x1 - x0) * (y1 - y0) > 0.9 else (x0, y0, x1, y1)
+
+    def adapt_scale(self, latency):
+        """Shrink the inference input when over the latency target, grow it back when well under"""
+        if self.average_latency is None:
+            self.average_latency = latency
+        self.average_latency = 0.8 * self.average_latency + 0.2 * latency
+        self.frames_since_scale_change += 1
+        if not self.enabled or self.frames_since_scale_change < 10:
+            return
+
+        if self.average_latency > self.target_latency * 1.1 and self.scale > self.min_scale:
+            self.scale = max(self.min_scale, self.scale * 0.9)
+            self.frames_since_scale_change = 0
+        elif self.average_latency < self.target_latency * 0.7 and self.scale < self.max_scale:
+            self.scale = min(self.max_scale, self.scale * 1.05)
+            self.frames_since_scale_change = 0
+
+    def region_fraction(self):
+        if self.region is None:
+            return 1.0
+        x0, y0, x1, y1 = self.region
+        return (x1 - x0) * (y1 - y0)
+
+
+class PoseResult:
+    """Minimal stand-in for the object returned by Pose.process"""
+    def __init__(self, pose_landmarks=None):
+        self.pose_landmarks = pose_landmarks
+
+
+def pose_worker(shm_name, slot_size, model_complexity, requests, responses):
+    """Inference process: read frames from shared memory, send back landmark arrays"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    pose = create_pose(model_complexity=model_complexity)
+    responses.put((0, None))  # ready; requests are numbered from 1
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            sequence, slot, shape = request
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_size)
+            results = pose.process(frame)
+            frame = None
+            if results.pose_landmarks:
+                responses.put((sequence, landmarks_to_array(results.pose_landmarks.landmark)))
+            else:
+                responses.put((sequence, None))
+    finally:
+        pose.close()
+        shm.close()
+
+
+class InferenceProcess:
+    """Drop-in replacement for a Pose graph that runs inference in a supervised worker process
+
+    Frames are copied into shared-memory ring slots instead of being pickled,
+    and only (33, 4) landmark arrays come back, so Pose.process no longer
+    competes with Tk and OpenCV drawing for the GIL. The worker is restarted
+    if it dies or stops answering. Only the first start waits for the graph to
+    be built; after a restart frames get no landmarks until the new worker
+    reports ready, so the capture loop never stalls on it.
+    """
+    def __init__(self, model_complexity=1, slots=2, timeout=2.0, startup_timeout=60.0):
+        self.model_complexity = model_complexity
+        self.slots = slots
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.context = multiprocessing.get_context("spawn")
+
+        self.shm = None
+        self.slot_size = 0
+        self.worker = None
+        self.requests = None
+        self.responses = None
+        self.started = False
+        self.start_time = 0.0
+        self.sequence = 0
+        self.restarts = 0
+
+    def start(self, slot_size):
+        self.slot_size = slot_size
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_size * self.slots)
+        self.requests = self.context.Queue()
+        self.responses = self.context.Queue()
+        self.worker = self.context.Process(
+            target=pose_worker,
+            args=(self.shm.name, slot_size, self.model_complexity, self.requests, self.responses),
+            daemon=True)
+        self.worker.start()
+        self.started = False
+        self.start_time = time.time()
+
+    def wait_ready(self, timeout):
+        """Wait up to `timeout` seconds for the worker's ready message; True once it has built its graph"""
+        deadline = time.time() + timeout
+        while not self.started:
+            try:
+                sequence, _ = self.responses.get(timeout=max(min(0.05, deadline - time.time()), 0))
+            except queue.Empty:
+                if not self.worker.is_alive() or time.time() >= deadline:
+                    return False
+                continue
+            self.started = sequence == 0
+        return True
+
+    def stop(self):
+        if self.worker is not None:
+            if self.worker.is_alive():
+                self.requests.put(None)
+                self.worker.join(timeout=1.0)
+            if self.worker.is_alive():
+                self.worker.terminate()
+                self.worker.join(timeout=1.0)
+            self.worker = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def restart(self, slot_size):
+        self.stop()
+        self.restarts += 1
+        self.start(slot_size)
+
+    def process(self, image):
+        """Run pose inference on an RGB image; returns an object with `pose_landmarks`"""
+        if self.shm is None:
+            self.start(image.nbytes)
+        elif image.nbytes > self.slot_size:
+            self.stop()
+            self.start(image.nbytes)
+        elif not self.worker.is_alive():
+            print(f"Inference worker exited (code {self.worker.exitcode}), restarting")
+            self.restart(self.slot_size)
+
+        if not self.started:
+            if self.restarts == 0:
+                ready = self.wait_ready(self.startup_timeout)
+            else:
+                ready = self.wait_ready(0)
+                if not ready and self.worker.is_alive() and time.time() - self.start_time < self.startup_timeout:
+                    return PoseResult()  # the restarted worker is still building its graph
+            if not ready:
+                print("Inference worker did not start, restarting")
+                self.restart(self.slot_size)
+                return PoseResult()
+
+        self.sequence += 1
+        slot = self.sequence % self.slots
+        buffer = np.ndarray(image.shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_size)
+        np.copyto(buffer, image)
+        buffer = None
+        self.requests.put((self.sequence, slot, image.shape))
+
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                sequence, landmarks = self.responses.get(timeout=0.05)
+            except queue.Empty:
+                if self.worker.is_alive() and time.time() < deadline:
+                    continue
+                print("Inference worker crashed or not responding, restarting")
+                self.restart(self.slot_size)
+                return PoseResult()
+            # Answers to frames we already gave up on are discarded
+            if sequence == self.sequence:
+                break
+
+        if landmarks is None:
+            return PoseResult()
+        return PoseResult(landmark_list_from_array(landmarks))
+
+    def close(self):
+        self.stop()
+
+
+class ComplexityController:
+    """Switches Pose model_complexity at runtime to stay within a frame budget
+
+    Drops a tier after a short run of over-budget frames and climbs back only
+    after a long run well under budget, with a cooldown between switches. The
+    next graph is built and warmed up on a background thread; the worker swaps
+    it in once it is ready, so inference never stalls on graph construction.
+    """
+    TIER_NAMES = {0: "Lite", 1: "Full", 2: "Heavy"}
+
+    def __init__(self, budget=0.033, tier=1, min_tier=0, max_tier=2,
+                 downgrade_frames=15, upgrade_frames=90, upgrade_ratio=0.45,
+                 switch_cooldown=5.0, warmup_frames=3, pose_factory=create_pose):
+        self.enabled = True
+        self.pose_factory = pose_factory
+        self.budget = budget
+        self.tier = tier
+        self.min_tier = min_tier
+        self.max_tier = max_tier
+        self.downgrade_frames = downgrade_frames
+        self.upgrade_frames = upgrade_frames
+        self.upgrade_ratio = upgrade_ratio
+        self.switch_cooldown = switch_cooldown
+        self.warmup_frames = warmup_frames
+
+        self.average_latency = None
+        self.over_budget_frames = 0
+        self.under_budget_frames = 0
+        self.last_switch_time = 0.0
+
+        self.lock = threading.Lock()
+        self.building = False
+        self.ready = None  # (tier, warmed-up Pose)
+
+    def observe(self, latency, rgb_frame, now, allow_upgrade=True):
+        """Feed one inference latency; may start warming up another tier"""
+        if self.average_latency is None:
+            self.average_latency = latency
+        self.average_latency = 0.9 * self.average_latency + 0.1 * latency
+
+        if self.average_latency > self.budget:
+            self.over_budget_frames += 1
+            self.under_budget_frames = 0
+        elif self.average_latency < self.budget * self.upgrade_ratio:
+            self.under_budget_frames += 1
+            self.over_budget_frames = 0
+        else:
+            self.over_budget_frames = 0
+            self.under_budget_frames = 0
+
+        if not self.enabled or self.building or self.ready is not None:
+            return
+        if now - self.last_switch_time < self.switch_cooldown:
+            return
+
+        target = None
+        if self.over_budget_frames >= self.downgrade_frames and self.tier > self.min_tier:
+            target = self.tier - 1
+        elif (allow_upgrade and self.under_budget_frames >= self.upgrade_frames
+              and self.tier < self.max_tier):
+            target = self.tier + 1
+
+        if target is not None:
+            self.building = True
+            threading.Thread(target=self.warm_up, args=(target, rgb_frame.copy()), daemon=True).start()
+
+    def warm_up(self, tier, rgb_frame):
+        try:
+            pose = self.pose_factory(model_complexity=tier)
+            for _ in range(self.warmup_frames):
+                pose.process(rgb_frame)
+        except Exception as e:
+            print(f"Model warm-up error (complexity {tier}): {e}")
+            pose = None
+        with self.lock:
+            self.building = False
+            if pose is not None:
+                self.ready = (tier, pose)
+            else:
+                self.last_switch_time = time.time()
+
+    def take_ready_pose(self):
+        """Return a warmed-up Pose for the new tier, or None; the caller closes the old one"""
+        if self.ready is None:
+            return None
+        with self.lock:
+            tier, pose = self.ready
+            self.ready = None
+        self.tier = tier
+        self.last_switch_time = time.time()
+        self.average_latency = None
+        self.over_budget_frames = 0
+        self.under_budget_frames = 0
+        return pose
+
+    def discard(self):
+        """Close a graph that was warmed up but never swapped in"""
+        with self.lock:
+            if self.ready is not None:
+                self.ready[1].close()
+                self.ready = None
+
+    def tier_name(self):
+        return f"{self.tier} ({self.TIER_NAMES[self.tier]})"
+
+
+class LandmarkExtrapolator:
+    """Predicts landmarks between pose inferences from their recent velocity
+
+    Velocity is a least-squares slope over the last few inferred frames;
+    predictions further than `max_horizon` past the last inference are
+    refused so the caller runs a fresh inference instead.
+    """
+    def __init__(self, history=3, max_horizon=0.15):
+        self.history = history
+        self.max_horizon = max_horizon
+        self.arrays = np.zeros((history, NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+        self.timestamps = np.zeros(history, dtype=np.float64)
+        self.head = 0
+        self.latest = 0
+        self.count = 0
+        self.last_timestamp = None
+        self.velocity = np.zeros((NUM_POSE_LANDMARKS, 3), dtype=np.float32)
+        self.output = np.zeros((NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.last_timestamp = None
+        self.velocity.fill(0)
+
+    def update(self, landmarks, timestamp):
+        """Add an inferred frame of MediaPipe landmarks"""
+        latest = self.head
+        landmarks_to_array(landmarks, out=self.arrays[latest])
+        self.timestamps[latest] = timestamp
+        self.head = (self.head + 1) % self.history
+        self.count = min(self.count + 1, self.history)
+        self.last_timestamp = timestamp
+        self.latest = latest
+
+        if self.count < 2:
+            self.velocity.fill(0)
+            return
+        times = self.timestamps[:self.count] - timestamp
+        centered = times - times.mean()
+        denominator = float(np.dot(centered, centered))
+        if denominator <= 0:
+            self.velocity.fill(0)
+            return
+        positions = self.arrays[:self.count, :, :3]
+        self.velocity[:] = np.tensordot(centered / denominator, positions, axes=1)
+
+    def predict(self, timestamp):
+        """Return extrapolated landmarks at `timestamp`, or None if a fresh inference is needed"""
+        if self.last_timestamp is None:
+            return None
+        dt = timestamp - self.last_timestamp
+        if dt < 0 or dt > self.max_horizon:
+            return None
+        last = self.arrays[self.latest]
+        np.multiply(self.velocity, dt, out=self.output[:, :3])
+        self.output[:, :3] += last[:, :3]
+        self.output[:, VISIBILITY] = last[:, VISIBILITY]
+        return landmarks_from_array(self.output)
+
+
+class InferenceScheduler:
+    """Decides which frames get a full Pose.process; the rest use extrapolated landmarks
+
+    Modes are a fixed interval (every Nth frame) or "budget", which keeps
+    Pose.process below `max_duty` of wall-clock time. All times are
+    time.perf_counter() values.
+    """
+    MODES = {"every frame": 1, "every 2nd": 2, "every 3rd": 3, "budget": 0}
+
+    def __init__(self, mode="every frame", max_duty=0.5):
+        self.set_mode(mode)
+        self.max_duty = max_duty
+        self.frame_index = 0
+        self.last_inference_start = 0.0
+        self.last_inference_duration = 0.0
+        self.inferred_frames = 0
+        self.extrapolated_frames = 0
+
+    def set_mode(self, mode):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown inference mode: {mode}")
+        self.mode = mode
+        self.interval = self.MODES[mode]
+
+    def should_infer(self, now):
+        self.frame_index += 1
+        if self.interval == 1:
+            return True
+        if self.interval > 1:
+            return self.frame_index % self.interval == 0
+        return now - self.last_inference_start >= self.last_inference_duration / self.max_duty
+
+    def record_inference(self, start, end):
+        self.last_inference_start = start
+        self.last_inference_duration = end - start
+        self.inferred_frames += 1
+
+    def inferred_ratio(self):
+        total = self.inferred_frames + self.extrapolated_frames
+        return self.inferred_frames / total if total else 1.0
+
+
+class MotionGate:
+    """Skips Pose.process while the scene is still, judged on a tiny grayscale frame
+
+    Each frame is shrunk to `size`, converted to gray and compared with the
+    frame the last inference ran on; `motion` is the fraction of pixels that
+    changed by more than `pixel_threshold` levels. Below `threshold` the last
+    landmarks are reused, but a fresh inference runs at least `min_rate` times
+    per second. Comparing with the last inferred frame rather than the
+    previous one keeps slow drift from slipping through a frame at a time.
+    """
+    def __init__(self, threshold=0.01, pixel_threshold=12, min_rate=4.0, size=(64, 48)):
+        self.enabled = True
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.min_rate = min_rate
+        self.size = size
+        self.small = None
+        self.gray = np.empty(size[::-1], dtype=np.uint8)
+        self.reference = np.empty(size[::-1], dtype=np.uint8)
+        self.diff = np.empty(size[::-1], dtype=np.uint8)
+        self.has_reference = False
+        self.motion = 1.0
+        self.last_inference = 0.0
+        self.inference_cost = 0.0  # smoothed seconds per Pose.process
+        self.inference_time = 0.0
+        self.skipped_frames = 0
+        self.gated_frames = 0
+
+    def reset(self):
+        self.has_reference = False
+
+    def changed(self, frame, now):
+        """True if the frame needs a fresh inference"""
+        self.gated_frames += 1
+        if not self.enabled:
+            return True
+        if self.small is None or self.small.shape[2] != frame.shape[2]:
+            self.small = np.empty((self.size[1], self.size[0], frame.shape[2]), dtype=np.uint8)
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        if not self.has_reference or now - self.last_inference >= 1.0 / self.min_rate:
+            return True
+
+        cv2.absdiff(self.gray, self.reference, dst=self.diff)
+        cv2.threshold(self.diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self.diff)
+        self.motion = cv2.countNonZero(self.diff) / self.diff.size
+        if self.motion >= self.threshold:
+            return True
+        self.skipped_frames += 1
+        return False
+
+    def record_inference(self, start, end):
+        """The current frame was inferred: it becomes the reference for the next ones"""
+        self.gray, self.reference = self.reference, self.gray
+        self.has_reference = self.enabled
+        self.last_inference = end
+        duration = end - start
+        self.inference_cost = duration if not self.inference_cost else 0.9 * self.inference_cost + 0.1 * duration
+        self.inference_time += duration
+
+    def skip_ratio(self):
+        return self.skipped_frames / self.gated_frames if self.gated_frames else 0.0
+
+    def saved_fraction(self):
+        """Share of Pose.process time avoided, estimated from the average inference cost"""
+        saved = self.skipped_frames * self.inference_cost
+        return saved / (saved + self.inference_time) if saved + self.inference_time > 0 else 0.0
+
+
+# Camera probing; the last working device and its negotiated profile are cached
+CAMERA_INDICES = (0, 1, 2)
+CAMERA_SETTINGS = {"width": 640, "height": 480, "fps": 30, "format": "MJPG"}
+CAMERA_CACHE = os.path.join(CONFIG_DIR, "camera.json")
+
+# Pixel formats to try, compressed first: MJPG keeps 30 FPS at higher resolutions over USB 2
+CAPTURE_FORMATS = ("MJPG", "YUYV")
+
+
+def capture_backends():
+    """OpenCV capture APIs to try, most direct first"""
+    if sys.platform.startswith("linux"):
+        return [("V4L2", cv2.CAP_V4L2), ("ANY", cv2.CAP_ANY)]
+    return [("ANY", cv2.CAP_ANY)]
+
+
+def fourcc_name(value):
+    code = int(value)
+    return "".join(chr((code >> 8 * i) & 0xFF) for i in range(4)).strip("\x00 ") or "?"
+
+
+def negotiate_capture(index, settings):
+    """Open a device with low-latency settings and read back what the driver accepted
+
+    Returns (cap, profile) or (None, None). The profile holds the backend,
+    pixel format, resolution, frame rate and buffer count actually in effect,
+    and whether the driver supplies usable frame timestamps.
+    """
+    formats = [settings.get("format")] + [name for name in CAPTURE_FORMATS if name != settings.get("format")]
+    for backend_name, backend in capture_backends():
+        cap = cv2.VideoCapture(index, backend)
+        selected = False
+        try:
+            if not cap.isOpened():
+                continue
+
+            for name in formats:
+                if name and cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*name)):
+                    if fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)) == name:
+                        break
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings["width"])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings["height"])
+            cap.set(cv2.CAP_PROP_FPS, settings["fps"])
+            # Smallest driver queue: older frames waiting in buffers are pure latency
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+            ret, _ = cap.read()
+            if not ret:
+                continue
+
+            # V4L2 reports the buffer timestamp (CLOCK_MONOTONIC) as POS_MSEC
+            driver_time = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            profile = {
+                "index": index,
+                "backend": backend_name if backend != cv2.CAP_ANY else cap.getBackendName(),
+                "format": fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "fps": cap.get(cv2.CAP_PROP_FPS),
+                "buffer_size": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+                "driver_timestamps": driver_time > 0 and 0 <= time.monotonic() - driver_time < 1.0
+            }
+            selected = True
+            return cap, profile
+        finally:
+            # Failed or raised: free the device now instead of whenever the object is collected
+            if not selected:
+                cap.release()
+    return None, None
+
+
+def probe_camera(index, settings):
+    """negotiate_capture for one probed index; an error counts as no camera there"""
+    try:
+        return negotiate_capture(index, settings)
+    except Exception as e:
+        print(f"Camera {index} probe error: {e}")
+        return None, None
+
+
+def describe_capture(profile):
+    buffers = profile["buffer_size"] if profile["buffer_size"] > 0 else "?"
+    timestamps = "driver" if profile["driver_timestamps"] else "read()"
+    return (f"{profile['backend']} #{profile['index']} {profile['format']} "
+            f"{profile['width']}x{profile['height']} @{profile['fps']:.0f} | "
+            f"buffers {buffers} | timestamps {timestamps}")
+
+
+def release_probed_camera(future):
+    cap, _ = future.result()
+    if cap is not None:
+        cap.release()
+
+
+def probe_cameras(indices=CAMERA_INDICES, cached=None, settings=None):
+    """Open the cached device, or probe all indices in parallel and keep the lowest that works
+
+    Returns (cap, profile) or (None, None). Every capture except the chosen
+    one is released; slow indices above it are released in the background
+    instead of being waited for.
+    """
+    settings = dict(settings or CAMERA_SETTINGS)
+    if cached:
+        settings.update({name: cached[name] for name in CAMERA_SETTINGS if name in cached})
+        cap, profile = probe_camera(cached["index"], settings)
+        if cap is not None:
+            return cap, profile
+
+    candidates = [index for index in indices if not cached or index != cached["index"]]
+    if not candidates:
+        return None, None
+    pool = ThreadPoolExecutor(max_workers=len(candidates))
+    futures = [pool.submit(probe_camera, index, settings) for index in candidates]
+    pool.shutdown(wait=False)
+
+    chosen = None, None
+    pending = list(futures)
+    try:
+        while pending and chosen[0] is None:
+            chosen = pending[0].result()
+            pending.pop(0)
+    finally:
+        # Every probe not selected, including one we stopped waiting on, is released when it finishes
+        for future in pending:
+            future.add_done_callback(release_probed_camera)
+    return chosen
+
+
+def load_camera_cache():
+    try:
+        with open(CAMERA_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_camera_cache(profile):
+    try:
+        os.makedirs(CONFIG_DIR, exist_ok=True)
+        temp_path = CAMERA_CACHE + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(profile, f, indent=2)
+        os.replace(temp_path, CAMERA_CACHE)
+    except OSError as e:
+        print(f"Camera cache error: {e}")
+
+
+# Headless daemon configuration; every key is optional
+DAEMON_DEFAULTS = {
+    "camera": {},                 # index or video file path, plus CAMERA_SETTINGS overrides
+    "parameters": {},             # TUNABLE_PARAMETERS and rule parameters
+    "keys": {},                   # gesture name -> key, overrides the rules' bindings
+    "rules": None,                # rules file path or inline {"parameters": ..., "gestures": [...]}
+    "key_output": "pynput",
+    "key_target": None,
+    "profile": None,
+    "predictive": False,
+    "model_complexity": 1,
+    "inference_process": False,
+    "mirror": True,
+    "motion_gate": True,
+    "roi_tracking": True,
+    "event_server": None,
+    "metrics": None,
+    "metrics_interval": 5.0,
+    "record": None,
+    "preview": None,              # {"path": "preview.jpg", "interval": 1.0, "width": 320}
+    "session_log": None,          # directory (or .npz path) for session log dumps on SIGUSR1
+    "status_interval": 10.0
+}
+
+
+def daemon_config(data, preview_path=True):
+    """Fill in defaults; unknown keys are errors, not typos to ignore"""
+    unknown = set(data) - set(DAEMON_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown daemon config keys: {', '.join(sorted(unknown))}")
+    config = dict(DAEMON_DEFAULTS, **data)
+    if config["key_output"] not in KEY_BACKENDS:
+        raise ValueError(f"Unknown key_output {config['key_output']!r}; choose from {', '.join(KEY_BACKENDS)}")
+    if preview_path and config["preview"] is not None and "path" not in config["preview"]:
+        raise ValueError("preview needs a path")
+    return config
+
+
+def load_daemon_config(path):
+    return daemon_config(read_config_file(path) or {})
+
+
+class GestureDaemon:
+    """Camera -> pose -> detect_gesture -> key output without Tk
+
+    Runs the pipeline on the calling thread (the camera is read by a
+    FrameGrabber, a video file by a VideoFileReader) until stop(),
+    SIGINT/SIGTERM or the end of the video; SIGHUP re-reads thresholds
+    and key bindings from the config file. An optional preview is written as
+    a small JPEG every few seconds instead of drawn in a window.
+    """
+    def __init__(self, config, config_path=None, status_queue=None, name=None):
+        self.config = config
+        self.config_path = config_path
+        # In multi-session mode status lines and previews go to the supervisor instead
+        self.status_queue = status_queue
+        self.name = name
+        self.capture_description = None
+        self.stop_event = threading.Event()
+        self.reload_requested = False
+        self.dump_requested = False
+        self.cap = None
+        self.grabber = None
+        self.pose = None
+        self.recorder = None
+
+        self.latency_tracker = LatencyTracker()
+        if config["metrics"]:
+            self.latency_tracker.start_export(config["metrics"], config["metrics_interval"])
+        self.key_emitter = KeyEmitter(create_key_backend(config["key_output"], config["key_target"]),
+                                      latency_tracker=self.latency_tracker)
+
+        rules = config["rules"]
+        if isinstance(rules, str):
+            rules = GestureRuleEngine.load(rules)
+        elif rules is not None:
+            rules = GestureRuleEngine.from_dict(rules)
+        self.detector = GestureDetector(key_sink=self.key_emitter, rules=rules, predictive=config["predictive"])
+        self.detector.session_log = self.key_emitter.session_log = SessionLog()
+        self.profile_path = calibration_profile_path(config["profile"]) if config["profile"] else None
+        if self.profile_path and os.path.exists(self.profile_path):
+            self.detector.load_profile(self.profile_path)
+            print(f"Loaded calibration profile {self.profile_path}")
+        self.apply_bindings(config)
+
+        self.event_server = EventServer(config["event_server"]) if config["event_server"] else None
+        if self.event_server is not None:
+            self.detector.event_sink = self.event_server
+            self.event_server.gestures = self.detector.gesture_names
+
+        self.buffers = FrameBuffers()
+        self.motion_gate = MotionGate()
+        self.motion_gate.enabled = config["motion_gate"]
+        self.roi_tracker = PoseRegionTracker(target_latency=0.033)
+        self.roi_tracker.enabled = config["roi_tracking"]
+        self.preview_buffer = None
+        self.preview_time = 0.0
+        self.frames = 0
+        self.current_gesture = "IDLE"
+
+    def apply_bindings(self, config):
+        """Thresholds and key bindings from the config; profile values are overridden"""
+        self.detector.apply_parameters(config["parameters"])
+        rules = {rule.name: rule for rule in self.detector.rule_engine.rules}
+        for gesture, key in config["keys"].items():
+            if gesture not in rules:
+                raise ValueError(f"No gesture rule named {gesture!r} to bind a key to")
+            rules[gesture].key = key
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: setattr(self, "reload_requested", True))
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: setattr(self, "dump_requested", True))
+
+    def stop(self):
+        self.stop_event.set()
+
+    def reload(self):
+        """Re-read thresholds and key bindings; camera and model changes need a restart"""
+        self.reload_requested = False
+        if not self.config_path:
+            return
+        try:
+            config = load_daemon_config(self.config_path)
+            self.apply_bindings(config)
+            self.config["parameters"], self.config["keys"] = config["parameters"], config["keys"]
+            print(f"Reloaded {self.config_path}")
+        except Exception as e:
+            print(f"Config reload error: {e}")
+
+    def dump_session_log(self):
+        self.dump_requested = False
+        try:
+            path = self.detector.dump_session_log(session_log_path(self.config["session_log"]),
+                                                  source="daemon", session=self.name)
+            print(f"Session log written to {path}")
+        except Exception as e:
+            print(f"Session log dump error: {e}")
+
+    def open_camera(self):
+        camera = dict(self.config["camera"])
+        device = camera.pop("index", None)
+        settings = dict(CAMERA_SETTINGS, **camera)
+        if isinstance(device, str):
+            # A video file stands in for the camera, e.g. to check a kiosk config
+            cap = cv2.VideoCapture(device)
+            if not cap.isOpened():
+                raise IOError(f"Cannot open video: {device}")
+            return cap, {"index": device, "driver_timestamps": False}
+        if device is not None:
+            cap, profile = negotiate_capture(device, settings)
+        else:
+            cached = load_camera_cache()
+            cap, profile = probe_cameras(cached={"index": cached["index"]} if cached else None,
+                                         settings=settings)
+        if cap is None:
+            raise IOError("No camera found")
+        print(f"Capture profile: {describe_capture(profile)}")
+        return cap, profile
+
+    def start(self):
+        self.cap, profile = self.open_camera()
+        self.capture_description = describe_capture(profile) if "backend" in profile else str(profile["index"])
+        self.pose = (InferenceProcess if self.config["inference_process"] else create_pose)(
+            model_complexity=self.config["model_complexity"])
+        if self.config["record"]:
+            self.recorder = LandmarkRecorder(self.config["record"], self.detector.gesture_names)
+        if self.event_server is not None:
+            self.event_server.start()
+            print(f"Event server listening on {self.event_server.url}")
+        self.key_emitter.start()
+        if isinstance(profile["index"], str):
+            self.grabber = VideoFileReader(self.cap)
+        else:
+            self.grabber = FrameGrabber(self.cap, driver_timestamps=profile["driver_timestamps"])
+        self.grabber.start()
+
+    def close(self):
+        if self.grabber:
+            self.grabber.stop()
+        if self.recorder:
+            self.recorder.close()
+        self.key_emitter.stop()
+        if self.event_server is not None:
+            self.event_server.stop()
+        if self.latency_tracker.export_thread:
+            self.latency_tracker.stop_export()
+        if self.cap:
+            self.cap.release()
+        if self.pose:
+            self.pose.close()
+        if self.profile_path:
+            try:
+                if self.detector.save_profile(self.profile_path):
+                    print(f"Saved calibration profile {self.profile_path}")
+            except Exception as e:
+                print(f"Profile save error: {e}")
+
+    def run(self, max_frames=None):
+        """Process frames until stopped; returns the number of frames processed"""
+        grabber = self.grabber
+        tracker = self.latency_tracker
+        buffers = self.buffers
+        pose_landmarks = None
+        inference_time = 0.0
+        status_time = time.time()
+        status_cpu = time.process_time()
+        status_frames = 0
+
+        while not self.stop_event.is_set() and (max_frames is None or self.frames < max_frames):
+            if self.reload_requested:
+                self.reload()
+            if self.dump_requested:
+                self.dump_session_log()
+            frame, capture_time = grabber.read()
+            if frame is None:
+                if isinstance(grabber, VideoFileReader):
+                    break  # end of the video file
+                continue
+            if grabber.driver_timestamps:
+                tracker.record("driver", grabber.last_driver_delay)
+            tracker.record("queue", time.time() - capture_time)
+            if self.config["mirror"]:
+                frame = buffers.mirror(frame)
+
+            if self.motion_gate.changed(frame, capture_time):
+                pose_input, crop = self.roi_tracker.prepare(buffers.to_rgb(frame))
+                preprocess_time = time.time()
+                tracker.record("preprocess", preprocess_time - capture_time)
+                results = self.pose.process(pose_input)
+                inference_time = time.time()
+                tracker.record("inference", inference_time - capture_time)
+                self.motion_gate.record_inference(preprocess_time, inference_time)
+                self.roi_tracker.update(results, crop, inference_time - preprocess_time)
+                pose_landmarks = results.pose_landmarks
+
+            gesture = "IDLE"
+            fired = ()
+            landmarks = pose_landmarks.landmark if pose_landmarks else None
+            if landmarks is not None:
+                gesture, _ = self.detector.detect_gesture(landmarks, capture_time)
+                fired = self.detector.fired
+                tracker.record("detect", time.time() - capture_time)
+            self.current_gesture = gesture
+            if self.recorder:
+                self.recorder.write(landmarks, capture_time, inference_time, fired)
+            if self.event_server is not None:
+                self.event_server.publish_landmarks(landmarks, capture_time, inference_time, fired)
+            if self.config["preview"] is not None:
+                self.write_preview(frame, gesture, capture_time)
+
+            now = time.time()
+            tracker.record("total", now - capture_time)
+            tracker.set_counter("dropped_frames_total", grabber.dropped_frames)
+            self.frames += 1
+            status_frames += 1
+
+            if now - status_time >= self.config["status_interval"]:
+                cpu = time.process_time()
+                elapsed = now - status_time
+                self.report_status(status_frames / elapsed, (cpu - status_cpu) / elapsed)
+                status_time, status_cpu, status_frames = now, cpu, 0
+        return self.frames
+
+    def status(self, fps, cpu):
+        """Snapshot for the multi-session supervisor; latencies are (p50, p95) in ms"""
+        latency = self.latency_tracker.summary()
+        return {
+            "fps": fps,
+            "cpu": cpu,
+            "gesture": self.current_gesture,
+            "calibrated": self.detector.calibrated,
+            "skipped": self.motion_gate.skip_ratio(),
+            "dropped": self.grabber.dropped_frames,
+            "gestures": dict(self.detector.gesture_count),
+            "key_failures": self.key_emitter.send_failures,
+            "latency": {stage: (latency[stage]["p50"], latency[stage]["p95"])
+                        for stage in ("inference", "total", "keypress") if stage in latency}
+        }
+
+    def report_status(self, fps, cpu):
+        if self.status_queue is not None:
+            self.status_queue.put(("status", self.name, self.status(fps, cpu)))
+            return
+        print(f"{fps:5.1f} FPS | CPU {cpu * 100:4.0f}% | "
+              f"skipped {int(self.motion_gate.skip_ratio() * 100)}% | dropped {self.grabber.dropped_frames} | "
+              + " ".join(f"{g}:{n}" for g, n in self.detector.gesture_count.items()))
+
+    def write_preview(self, frame, gesture, now):
+        """Atomically replace the preview JPEG at most once per interval"""
+        preview = self.config["preview"]
+        if now - self.preview_time < preview.get("interval", 1.0):
+            return
+        self.preview_time = now
+        height, width = frame.shape[:2]
+        size = (preview.get("width", 320), max(int(height * preview.get("width", 320) / width), 1))
+        self.preview_buffer = FrameBuffers.reuse(self.preview_buffer, (size[1], size[0], 3))
+        image = cv2.resize(frame, size, dst=self.preview_buffer, interpolation=cv2.INTER_AREA)
+        cv2.putText(image, gesture, (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 245), 2, cv2.LINE_AA)
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        if not ok:
+            return
+        if self.status_queue is not None:
+            self.status_queue.put(("preview", self.name, data.tobytes()))
+            return
+        try:
+            temp_path = preview["path"] + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data.tobytes())
+            os.replace(temp_path, preview["path"])
+        except OSError as e:
+            print(f"Preview error: {e}")
+
+
+def run_daemon(path, max_frames=None):
+    """Headless entry point: runs until SIGINT/SIGTERM, then shuts down cleanly"""
+    daemon = GestureDaemon(load_daemon_config(path), config_path=path)
+    daemon.install_signal_handlers()
+    try:
+        daemon.start()
+        print(f"GestureX daemon running ({path}); send SIGHUP to reload thresholds and keys, "
+              f"SIGUSR1 to dump the session log")
+        frames = daemon.run(max_frames=max_frames)
+    finally:
+        daemon.close()
+    print(f"Stopped after {frames} frames | Gestures: " +
+          " | ".join(f"{g}: {n}" for g, n in daemon.detector.gesture_count.items()))
+
+
+# Multi-session mode: one camera per player, each in its own GestureDaemon process
+SESSION_DEFAULTS = {
+    "status_interval": 1.0,
+    "preview": {"interval": 0.2, "width": 320}
+}
+SESSIONS_KEYS = ("sessions", "defaults", "pin_cores", "restart_delay")
+# Per-session paths may contain {name} so shared defaults do not collide
+SESSION_PATH_KEYS = ("profile", "record", "metrics", "key_target", "session_log")
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin_to_core(core):
+    """Restrict this process to one core; OpenCV then gets a single thread too"""
+    if core is None or not hasattr(os, "sched_setaffinity"):
+        return False
+    os.sched_setaffinity(0, {core})
+    cv2.setNumThreads(1)
+    return True
+
+
+def session_configs(data):
+    """Turn a multi-session config into [(name, core, daemon config)]
+
+    Each entry under "sessions" is a daemon config laid over "defaults";
+    dict values (camera, parameters, keys) are merged one level deep. With
+    pin_cores (default) session i gets its own core, leaving the first one
+    to the supervisor when there are enough.
+    """
+    unknown = set(data) - set(SESSIONS_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown sessions config keys: {', '.join(sorted(unknown))}")
+    if not data.get("sessions"):
+        raise ValueError("No sessions configured")
+
+    cores = available_cores() if data.get("pin_cores", True) else []
+    offset = 1 if len(cores) > len(data["sessions"]) else 0
+    sessions = []
+    names = set()
+    cameras = set()
+    for i, entry in enumerate(data["sessions"]):
+        entry = dict(entry)
+        name = str(entry.pop("name", f"P{i + 1}"))
+        core = entry.pop("core", cores[(i + offset) % len(cores)] if cores else None)
+
+        merged = dict(SESSION_DEFAULTS, **data.get("defaults", {}))
+        for key, value in entry.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                value = dict(merged[key], **value)
+            merged[key] = value
+        for key in SESSION_PATH_KEYS:
+            if isinstance(merged.get(key), str):
+                merged[key] = merged[key].format(name=name)
+        config = daemon_config(merged, preview_path=False)
+
+        camera = config["camera"].get("index")
+        if camera is None:
+            raise ValueError(f"Session {name} needs a camera index")
+        if name in names or camera in cameras:
+            raise ValueError(f"Session {name} repeats a name or camera ({camera}) of another session")
+        names.add(name)
+        cameras.add(camera)
+        sessions.append((name, core, config))
+    return sessions
+
+
+def session_worker(name, config, core, status_queue, stop_event):
+    """Session process: its own camera, Pose graph, GestureDetector and key output"""
+    # Ctrl+C reaches the whole process group; only the supervisor acts on it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)  # until there is a log to dump
+    pin_to_core(core)
+    daemon = None
+    try:
+        daemon = GestureDaemon(config, status_queue=status_queue, name=name)
+        daemon.stop_event = stop_event
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: setattr(daemon, "dump_requested", True))
+        daemon.start()
+        status_queue.put(("started", name, daemon.capture_description))
+        daemon.run()
+    except Exception as e:
+        status_queue.put(("error", name, str(e)))
+        sys.exit(1)
+    finally:
+        if daemon is not None:
+            daemon.close()
+
+
+class PlayerSession:
+    """Supervisor-side view of one session process"""
+    def __init__(self, name, core, config):
+        self.name = name
+        self.core = core
+        self.config = config
+        self.process = None
+        self.state = "starting"
+        self.capture = ""
+        self.error = None
+        self.restarts = 0
+        self.restart_time = None
+        self.status = {}
+        self.preview = None
+        self.preview_sequence = 0
+
+
+class SessionSupervisor:
+    """Starts one session process per camera, restarts crashed ones and gathers their status
+
+    Sessions share nothing but the status queue: each process pins itself to
+    its core and runs capture, inference, detection and key output on its own,
+    so throughput grows with the number of cores instead of the GIL.
+    """
+    def __init__(self, sessions, restart_delay=2.0):
+        self.context = multiprocessing.get_context("spawn")
+        self.status_queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.restart_delay = restart_delay
+        self.sessions = {name: PlayerSession(name, core, config) for name, core, config in sessions}
+
+    def start(self):
+        for session in self.sessions.values():
+            self.launch(session)
+
+    def launch(self, session):
+        session.state = "starting"
+        session.restart_time = None
+        session.process = self.context.Process(
+            target=session_worker,
+            args=(session.name, session.config, session.core, self.status_queue, self.stop_event),
+            name=f"gesturex-{session.name}", daemon=True)
+        session.process.start()
+
+    def poll(self, timeout=0.0):
+        """Apply queued status messages and supervise the processes; call regularly"""
+        self.drain(timeout)
+        if not self.stop_event.is_set():
+            self.supervise()
+
+    def drain(self, timeout=0.0):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                kind, name, payload = self.status_queue.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            session = self.sessions[name]
+            if kind == "status":
+                session.status = payload
+                session.state = "running"
+            elif kind == "preview":
+                session.preview = payload
+                session.preview_sequence += 1
+            elif kind == "started":
+                session.capture = payload
+                session.state = "running"
+                session.error = None
+            elif kind == "error":
+                session.error = payload
+
+    def supervise(self):
+        now = time.time()
+        for session in self.sessions.values():
+            process = session.process
+            if process is None or process.is_alive():
+                continue
+            if process.exitcode == 0:
+                session.state = "finished"  # a video file standing in for the camera ended
+                session.process = None
+            elif session.restart_time is None:
+                session.state = f"exited ({process.exitcode})"
+                session.restart_time = now + self.restart_delay
+            elif now >= session.restart_time:
+                session.restarts += 1
+                self.launch(session)
+
+    def running(self):
+        return any(session.process is not None for session in self.sessions.values())
+
+    def dump_session_logs(self):
+        """Ask every running session to dump its session log"""
+        if not hasattr(signal, "SIGUSR1"):
+            print("Session log dumps need SIGUSR1, which this platform does not have")
+            return
+        for session in self.sessions.values():
+            if session.process is not None and session.process.is_alive():
+                os.kill(session.process.pid, signal.SIGUSR1)
+
+    def total_fps(self):
+        return sum(session.status.get("fps", 0.0) for session in self.sessions.values()
+                   if session.state == "running")
+
+    def stop(self, timeout=3.0):
+        """Ask every session to finish (profiles are saved), then terminate stragglers"""
+        self.stop_event.set()
+        deadline = time.time() + timeout
+        # Keep draining: a child cannot exit while its queued messages are unread
+        while time.time() < deadline and any(session.process is not None and session.process.is_alive()
+                                             for session in self.sessions.values()):
+            self.drain(timeout=0.1)
+        for session in self.sessions.values():
+            if session.process is not None:
+                if session.process.is_alive():
+                    session.process.terminate()
+                    session.process.join(timeout=1.0)
+                session.process = None
+                session.state = "stopped"
+
+
+def session_stats(session):
+    """Status fields of one session, shared by the console report and the supervisor window"""
+    status = session.status
+    if session.state != "running" or not status:
+        fields = [session.state]
+    else:
+        fields = [f"{status['fps']:.1f} FPS | CPU {status['cpu'] * 100:.0f}%",
+                  "p50/p95 ms: " + (" ".join(f"{stage} {p50:.0f}/{p95:.0f}"
+                                             for stage, (p50, p95) in status["latency"].items()) or "-"),
+                  f"skipped {int(status['skipped'] * 100)}% | dropped {status['dropped']}",
+                  " ".join(f"{g}:{n}" for g, n in status["gestures"].items())]
+        if status["key_failures"]:
+            fields.append(f"key errors {status['key_failures']}")
+    if session.restarts:
+        fields.append(f"restarts {session.restarts}")
+    if session.error:
+        fields.append(session.error)
+    return fields
+
+
+def describe_session(session):
+    core = f"core {session.core}" if session.core is not None else "any core"
+    gesture = ""
+    if session.state == "running" and session.status:
+        gesture = f" {session.status['gesture'] if session.status['calibrated'] else 'CALIBRATING'}"
+    return f"{session.name} [{core}]{gesture} | " + " | ".join(session_stats(session))
+
+
+class SessionSupervisorUI:
+    """One Tk window for all sessions: preview, gesture and latency stats per player"""
+    def __init__(self, master, supervisor):
+        self.master = master
+        self.supervisor = supervisor
+        self.panels = {}
+        self.master.title("GestureX - Multi-Session")
+        self.master.configure(bg='#1a1a2e')
+
+        grid = tk.Frame(self.master, bg='#1a1a2e')
+        grid.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columns = min(len(supervisor.sessions), 3)
+        for i, session in enumerate(supervisor.sessions.values()):
+            panel = tk.Frame(grid, bg='#16213e', relief=tk.RAISED, bd=3)
+            panel.grid(row=i // columns, column=i % columns, padx=5, pady=5, sticky="nsew")
+            tk.Label(panel, text=session.name, font=('Arial', 14, 'bold'),
+                     bg='#16213e', fg='#00fff5').pack(pady=(5, 0))
+            capture = tk.Label(panel, text="", font=('Arial', 8), bg='#16213e', fg='#aaaaaa')
+            capture.pack()
+            preview = tk.Label(panel, bg='#0f3460', text="Waiting for camera", width=40, height=12)
+            preview.pack(padx=5, pady=5)
+            gesture = tk.Label(panel, text="IDLE", font=('Arial', 20, 'bold'), bg='#16213e', fg='#00fff5')
+            gesture.pack()
+            stats = tk.Label(panel, text="", font=('Arial', 9), bg='#16213e', fg='#ffffff', justify=tk.LEFT)
+            stats.pack(padx=5, pady=5, anchor=tk.W)
+            self.panels[session.name] = {"capture": capture, "preview": preview, "gesture": gesture,
+                                         "stats": stats, "photo": None, "sequence": 0}
+
+        self.total_label = tk.Label(self.master, text="", font=('Arial', 12, 'bold'), bg='#1a1a2e', fg='#00fff5')
+        self.total_label.pack(pady=(0, 10))
+        self.master.bind("<F9>", lambda event: supervisor.dump_session_logs())
+        self.update_ui()
+
+    def update_ui(self):
+        self.supervisor.poll()
+        for session in self.supervisor.sessions.values():
+            panel = self.panels[session.name]
+            status = session.status
+            panel["capture"].config(text=session.capture or session.state)
+            if session.state == "running" and status:
+                panel["gesture"].config(text=status["gesture"] if status["calibrated"] else "CALIBRATING")
+            else:
+                panel["gesture"].config(text=session.state.upper())
+            panel["stats"].config(text="\n".join(session_stats(session)))
+            if session.preview is not None and session.preview_sequence != panel["sequence"]:
+                panel["sequence"] = session.preview_sequence
+                image = Image.open(io.BytesIO(session.preview))
+                if panel["photo"] is None or (panel["photo"].width(), panel["photo"].height()) != image.size:
+                    panel["photo"] = ImageTk.PhotoImage(image=image)
+                    panel["preview"].config(image=panel["photo"], text="", width=image.width, height=image.height)
+                else:
+                    panel["photo"].paste(image)
+
+        running = sum(session.state == "running" for session in self.supervisor.sessions.values())
+        self.total_label.config(text=f"{running}/{len(self.supervisor.sessions)} sessions running | "
+                                     f"total {self.supervisor.total_fps():.1f} FPS")
+        self.master.after(50, self.update_ui)
+
+
+def run_sessions(path, window=True):
+    """Multi-session entry point: one process per camera under a shared supervisor"""
+    data = read_config_file(path) or {}
+    supervisor = SessionSupervisor(session_configs(data), restart_delay=data.get("restart_delay", 2.0))
+    for session in supervisor.sessions.values():
+        core = f"core {session.core}" if session.core is not None else "any core"
+        print(f"Session {session.name}: camera {session.config['camera']['index']} on {core}")
+    supervisor.start()
+    try:
+        if window and tk is not None:
+            root = tk.Tk()
+            SessionSupervisorUI(root, supervisor)
+            root.protocol("WM_DELETE_WINDOW", root.destroy)
+            root.mainloop()
+        else:
+            stopping = threading.Event()
+            signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+            if hasattr(signal, "SIGUSR1"):
+                signal.signal(signal.SIGUSR1, lambda signum, frame: supervisor.dump_session_logs())
+            report_time = time.time()
+            while supervisor.running() and not stopping.is_set():
+                supervisor.poll(timeout=0.2)
+                if time.time() - report_time >= 5.0:
+                    report_time = time.time()
+                    for session in supervisor.sessions.values():
+                        print(describe_session(session))
+                    print(f"total {supervisor.total_fps():.1f} FPS")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+    print("Sessions stopped")
+
 
 class TempleRunController:
-    def __init__(self, master):
+    def __init__(self, master, record_path=None, metrics_path=None, metrics_interval=5.0,
+                 inference_process=False, key_backend=None, rules=None, predictive=False,
+                 profile=None, event_server=None, session_log=None):
         self.master = master
         self.master.title("Temple Run Body Controller - Single Press")
         self.master.configure(bg='#1a1a2e')
         self.master.geometry("1400x800")
 
-        # MediaPipe setup
-        self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
-
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            smooth_landmarks=True,
-            enable_segmentation=False,
-            smooth_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # MediaPipe is imported and the Pose graph warmed up in the background
+        # (see warm_up_pose) so the window appears immediately
+        self.mp_pose = None
+        self.mp_drawing = None
+        self.mp_drawing_styles = None
+        self.closing = False
+        self.startup_times = {}
 
-        # Keyboard controller
-        self.keyboard = Controller()
+        # Pose graph, optionally hosted in a supervised worker process
+        pose_factory = InferenceProcess if inference_process else create_pose
+        self.pose_factory = pose_factory
+        self.pose = None
+        self.pose_ready = threading.Event()
+        self.complexity_controller = ComplexityController(budget=0.033, tier=1, pose_factory=pose_factory)
+
+        # Optional reduced inference rate, detection runs on extrapolated landmarks in between
+        self.inference_scheduler = InferenceScheduler(mode="every frame")
+        self.extrapolator = LandmarkExtrapolator(max_horizon=0.15)
+
+        # Reuse the last landmarks while the scene is still
+        self.motion_gate = MotionGate()
+
+        # Per-stage latency, capture -> keypress
+        self.latency_tracker = LatencyTracker()
+        self.show_latency_hud = False
+
+        # Crop and downscale Pose.process input to hit the inference budget
+        self.roi_tracker = PoseRegionTracker(target_latency=0.033)
+        self.hud_lines = []
+        self.hud_updated = 0.0
+        if metrics_path:
+            self.latency_tracker.start_export(metrics_path, metrics_interval)
+
+        # Gesture logic; keys are sent from a separate output thread
+        self.key_emitter = KeyEmitter(key_backend if key_backend is not None else KeyboardSink(),
+                                      latency_tracker=self.latency_tracker)
+        self.key_emitter.start()
+        self.detector = GestureDetector(key_sink=self.key_emitter, rules=rules, predictive=predictive)
+        # Last minutes of detection state, dumped with F9 (also while the game has focus)
+        self.session_log_target = session_log
+        self.detector.session_log = self.key_emitter.session_log = SessionLog()
+        self.log_hotkey = None
+        self.event_server = event_server
+        if event_server is not None:
+            self.detector.event_sink = event_server
+            event_server.gestures = self.detector.gesture_names
+            event_server.start()
+            print(f"Event server listening on {event_server.url}")
+        self.profile_path = calibration_profile_path(profile) if profile else None
+        if self.profile_path and os.path.exists(self.profile_path):
+            try:
+                self.detector.load_profile(self.profile_path)
+                print(f"Loaded calibration profile {self.profile_path}")
+            except Exception as e:
+                print(f"Profile load error: {e}")
 
         # Camera setup
         self.cap = None
+        self.grabber = None
         self.camera_active = False
+        self.camera_opening = False
+        self.camera_probe = None
+        self.capture_profile = None
         self.processing_thread = None
-
-        # Gesture detection parameters
-        self.jump_threshold = 0.15
-        self.slide_single_hand_threshold = 0.12
-        self.slide_body_angle = 20
-        self.tilt_sensitivity = 0.08
-        self.cooldown_time = 0.5  # Increased cooldown for single press
         self.show_skeleton = True
 
-        # State tracking with gesture completion
-        self.last_gesture_time = 0
+        # Optional landmark recording of every processed frame
+        self.record_path = record_path
+        self.recorder = None
+
+        # Latest worker results
         self.current_gesture = "IDLE"
-        self.previous_gesture = "IDLE"
-        self.gesture_in_progress = False
-        self.neutral_center_x = None
-        self.neutral_shoulder_hip_distance = None
-        self.calibration_frames = []
-        self.landmark_buffer = deque(maxlen=7)
-
-        # Gesture state tracking (to prevent continuous trigger)
-        self.gesture_states = {
-            "JUMP": False,
-            "SLIDE": False,
-            "LEFT": False,
-            "RIGHT": False
-        }
 
         # FPS tracking
         self.fps = 0
         self.frame_times = deque(maxlen=30)
 
-        # Thread-safe frame storage
-        self.current_frame = None
-        self.frame_lock = threading.Lock()
+        # Display-ready preview, rendered by the worker at the canvas size
+        self.display_size = (800, 600)
+        self.display_interpolation = "Linear"
+        self.photo = None
+        self.displayed_sequence = 0
 
-        # Gesture counter
-        self.gesture_count = {
-            "JUMP": 0,
-            "SLIDE": 0,
-            "LEFT": 0,
-            "RIGHT": 0
-        }
+        # Thread-safe frame exchange; the worker publishes display slots, Tk pastes them
+        self.frame_buffers = FrameBuffers()
+        self.frame_sequence = 0
+        self.current_capture_time = 0.0
+        self.frame_latency = 0.0
+        self.frame_lock = threading.Lock()
 
         self.setup_ui()
+        self.start_log_hotkey()
+        self.master.after(0, self.record_startup, "window")
+        threading.Thread(target=self.warm_up_pose, daemon=True).start()
+        self.master.after(200, self.update_startup_label)
+
+    def start_log_hotkey(self):
+        """F9 dumps the session log; pynput also catches it while the game window has focus"""
+        self.master.bind("<F9>", lambda event: self.dump_session_log())
+        try:
+            from pynput.keyboard import GlobalHotKeys
+            self.log_hotkey = GlobalHotKeys({"<f9>": self.dump_session_log})
+            self.log_hotkey.start()
+        except Exception as e:
+            print(f"Global session log hotkey unavailable ({e}); F9 works while this window has focus")
+
+    def dump_session_log(self):
+        """Write the session log; called from Tk or the hotkey thread, touches no widgets"""
+        try:
+            path = self.detector.dump_session_log(session_log_path(self.session_log_target), source="app")
+            print(f"Session log written to {path}")
+        except Exception as e:
+            print(f"Session log dump error: {e}")
+
+    def warm_up_pose(self):
+        """Import MediaPipe and run one inference so the first camera frame is not slow"""
+        try:
+            mp = load_mediapipe()
+            self.mp_pose = mp.solutions.pose
+            self.mp_drawing = mp.solutions.drawing_utils
+            self.mp_drawing_styles = mp.solutions.drawing_styles
+
+            pose = self.pose_factory(model_complexity=1)
+            pose.process(np.zeros((480, 640, 3), dtype=np.uint8))
+            if self.closing:
+                pose.close()
+                return
+            self.pose = pose
+            self.pose_ready.set()
+            self.record_startup("model")
+        except Exception as e:
+            self.startup_times["error"] = str(e)
+            print(f"Pose warm-up error: {e}")
+
+    def record_startup(self, stage):
+        """Remember seconds from launch until a startup milestone and report it"""
+        self.startup_times[stage] = time.perf_counter() - STARTUP_TIME
+        print(f"Startup: {stage} ready after {self.startup_times[stage] * 1000:.0f} ms")
+
+    def update_startup_label(self):
+        """Show startup milestones; polls until the Pose warm-up has finished"""
+        times = self.startup_times
+        parts = [f"{stage} {times[stage] * 1000:.0f} ms" for stage in ("window", "model", "camera") if stage in times]
+        if "error" in times:
+            parts.append(f"model error: {times['error']}")
+        self.startup_label.config(text="Startup: " + (" | ".join(parts) or "loading model..."))
+        if "model" not in times and "error" not in times:
+            self.master.after(200, self.update_startup_label)
 
     def setup_ui(self):
         """Create the modern GUI"""
@@ -118,6 +3703,26 @@ class TempleRunController:
                                    bg='#16213e', fg='#ffffff')
         self.angle_label.pack(side=tk.LEFT, padx=20)
 
+        self.latency_label = tk.Label(info_frame, text="Latency: 0 ms | Dropped: 0",
+                                     font=('Arial', 12),
+                                     bg='#16213e', fg='#ffffff')
+        self.latency_label.pack(side=tk.LEFT, padx=20)
+
+        self.roi_label = tk.Label(info_frame, text="ROI: full | Scale: 1.00x",
+                                 font=('Arial', 12),
+                                 bg='#16213e', fg='#ffffff')
+        self.roi_label.pack(side=tk.LEFT, padx=20)
+
+        self.model_label = tk.Label(info_frame, text="Model: 1 (Full)",
+                                   font=('Arial', 12),
+                                   bg='#16213e', fg='#ffffff')
+        self.model_label.pack(side=tk.LEFT, padx=20)
+
+        self.gate_label = tk.Label(info_frame, text="Skipped: 0% | CPU saved: 0%",
+                                  font=('Arial', 12),
+                                  bg='#16213e', fg='#ffffff')
+        self.gate_label.pack(side=tk.LEFT, padx=20)
+
         # Right panel - Controls
         right_panel = tk.Frame(main_frame, bg='#16213e', relief=tk.RAISED, bd=3, width=420)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(10, 0))
@@ -151,6 +3756,13 @@ class TempleRunController:
                                      justify=tk.CENTER)
         self.counter_label.pack(pady=5)
 
+        self.output_label = tk.Label(counter_frame,
+                                    text="Keys sent: 0 | Failed: 0",
+                                    font=('Arial', 9),
+                                    bg='#1a1a2e', fg='#aaaaaa',
+                                    justify=tk.CENTER)
+        self.output_label.pack(pady=(0, 5))
+
         # Gesture rules info
         rules_frame = tk.Frame(right_panel, bg='#1a1a2e', relief=tk.RAISED, bd=2)
         rules_frame.pack(pady=10, padx=20, fill=tk.X)
@@ -210,6 +3822,15 @@ Return to neutral to trigger again!"""
                                      cursor='hand2')
         reset_counter_btn.pack(pady=5, fill=tk.X)
 
+        dump_log_btn = tk.Button(button_frame, text="💾 DUMP SESSION LOG (F9)",
+                                 command=self.dump_session_log,
+                                 bg='#3498db', fg='#ffffff',
+                                 font=('Arial', 10, 'bold'),
+                                 relief=tk.RAISED, bd=2,
+                                 activebackground='#2980b9',
+                                 cursor='hand2')
+        dump_log_btn.pack(pady=5, fill=tk.X)
+
         # Camera status
         status_frame = tk.Frame(right_panel, bg='#16213e')
         status_frame.pack(pady=10, padx=20, fill=tk.X)
@@ -223,6 +3844,16 @@ Return to neutral to trigger again!"""
                                         bg='#16213e', fg='#ff6b6b')
         self.status_indicator.pack(side=tk.LEFT, padx=10)
 
+        self.startup_label = tk.Label(right_panel, text="Startup: loading model...",
+                                      font=('Arial', 9),
+                                      bg='#16213e', fg='#aaaaaa')
+        self.startup_label.pack(padx=20, anchor=tk.W)
+
+        self.capture_label = tk.Label(right_panel, text="Capture: not negotiated",
+                                      font=('Arial', 9),
+                                      bg='#16213e', fg='#aaaaaa')
+        self.capture_label.pack(padx=20, anchor=tk.W)
+
         # Sliders
         slider_frame = tk.Frame(right_panel, bg='#16213e')
         slider_frame.pack(pady=10, padx=20, fill=tk.BOTH, expand=True)
@@ -232,15 +3863,15 @@ Return to neutral to trigger again!"""
                 bg='#16213e', fg='#00fff5').pack(pady=8)
 
         self.create_slider(slider_frame, "Jump Threshold", 0.05, 0.30,
-                          self.jump_threshold, self.update_jump_threshold)
+                          self.detector.jump_threshold, self.update_jump_threshold)
         self.create_slider(slider_frame, "Single Hand Slide", 0.05, 0.25,
-                          self.slide_single_hand_threshold, self.update_slide_threshold)
+                          self.detector.slide_single_hand_threshold, self.update_slide_threshold)
         self.create_slider(slider_frame, "Body Bend Angle (°)", 10, 45,
-                          self.slide_body_angle, self.update_body_angle)
+                          self.detector.slide_body_angle, self.update_body_angle)
         self.create_slider(slider_frame, "Tilt Sensitivity", 0.03, 0.15,
-                          self.tilt_sensitivity, self.update_tilt_sensitivity)
+                          self.detector.tilt_sensitivity, self.update_tilt_sensitivity)
         self.create_slider(slider_frame, "Cooldown (sec)", 0.3, 1.0,
-                          self.cooldown_time, self.update_cooldown)
+                          self.detector.cooldown_time, self.update_cooldown)
 
         # Skeleton toggle
         skeleton_frame = tk.Frame(right_panel, bg='#16213e')
@@ -257,6 +3888,112 @@ Return to neutral to trigger again!"""
                                        activeforeground='#00fff5')
         skeleton_check.pack()
 
+        self.latency_hud_var = tk.BooleanVar(value=False)
+        latency_check = tk.Checkbutton(skeleton_frame, text="✓ Show Latency HUD",
+                                      variable=self.latency_hud_var,
+                                      command=self.toggle_latency_hud,
+                                      bg='#16213e', fg='#ffffff',
+                                      selectcolor='#0f3460',
+                                      font=('Arial', 10, 'bold'),
+                                      activebackground='#16213e',
+                                      activeforeground='#00fff5')
+        latency_check.pack()
+
+        self.roi_var = tk.BooleanVar(value=True)
+        roi_check = tk.Checkbutton(skeleton_frame, text="✓ ROI Tracking / Adaptive Resolution",
+                                  variable=self.roi_var,
+                                  command=self.toggle_roi_tracking,
+                                  bg='#16213e', fg='#ffffff',
+                                  selectcolor='#0f3460',
+                                  font=('Arial', 10, 'bold'),
+                                  activebackground='#16213e',
+                                  activeforeground='#00fff5')
+        roi_check.pack()
+
+        self.auto_model_var = tk.BooleanVar(value=True)
+        auto_model_check = tk.Checkbutton(skeleton_frame, text="✓ Auto Model Complexity",
+                                         variable=self.auto_model_var,
+                                         command=self.toggle_auto_model,
+                                         bg='#16213e', fg='#ffffff',
+                                         selectcolor='#0f3460',
+                                         font=('Arial', 10, 'bold'),
+                                         activebackground='#16213e',
+                                         activeforeground='#00fff5')
+        auto_model_check.pack()
+
+        self.predictive_var = tk.BooleanVar(value=self.detector.predictive)
+        predictive_check = tk.Checkbutton(skeleton_frame, text="✓ Predictive Jump/Slide Trigger",
+                                         variable=self.predictive_var,
+                                         command=self.toggle_predictive,
+                                         bg='#16213e', fg='#ffffff',
+                                         selectcolor='#0f3460',
+                                         font=('Arial', 10, 'bold'),
+                                         activebackground='#16213e',
+                                         activeforeground='#00fff5')
+        predictive_check.pack()
+
+        self.motion_gate_var = tk.BooleanVar(value=self.motion_gate.enabled)
+        motion_gate_check = tk.Checkbutton(skeleton_frame, text="✓ Skip Inference While Still",
+                                          variable=self.motion_gate_var,
+                                          command=self.toggle_motion_gate,
+                                          bg='#16213e', fg='#ffffff',
+                                          selectcolor='#0f3460',
+                                          font=('Arial', 10, 'bold'),
+                                          activebackground='#16213e',
+                                          activeforeground='#00fff5')
+        motion_gate_check.pack()
+
+        # Smoothing filter selector
+        smoothing_frame = tk.Frame(right_panel, bg='#16213e')
+        smoothing_frame.pack(pady=5, padx=20)
+
+        tk.Label(smoothing_frame, text="Smoothing:",
+                font=('Arial', 10, 'bold'),
+                bg='#16213e', fg='#ffffff').pack(side=tk.LEFT)
+
+        self.smoothing_var = tk.StringVar(value=self.detector.landmark_buffer.mode)
+        smoothing_menu = tk.OptionMenu(smoothing_frame, self.smoothing_var,
+                                       *LandmarkSmoother.MODES,
+                                       command=self.update_smoothing_mode)
+        smoothing_menu.config(bg='#0f3460', fg='#00fff5',
+                              activebackground='#16213e',
+                              highlightthickness=0)
+        smoothing_menu.pack(side=tk.LEFT, padx=10)
+
+        # Pose inference rate selector
+        inference_frame = tk.Frame(right_panel, bg='#16213e')
+        inference_frame.pack(pady=5, padx=20)
+
+        tk.Label(inference_frame, text="Inference:",
+                font=('Arial', 10, 'bold'),
+                bg='#16213e', fg='#ffffff').pack(side=tk.LEFT)
+
+        self.inference_var = tk.StringVar(value=self.inference_scheduler.mode)
+        inference_menu = tk.OptionMenu(inference_frame, self.inference_var,
+                                       *InferenceScheduler.MODES,
+                                       command=self.update_inference_mode)
+        inference_menu.config(bg='#0f3460', fg='#00fff5',
+                              activebackground='#16213e',
+                              highlightthickness=0)
+        inference_menu.pack(side=tk.LEFT, padx=10)
+
+        # Preview scaling quality
+        display_frame = tk.Frame(right_panel, bg='#16213e')
+        display_frame.pack(pady=5, padx=20)
+
+        tk.Label(display_frame, text="Preview Scaling:",
+                font=('Arial', 10, 'bold'),
+                bg='#16213e', fg='#ffffff').pack(side=tk.LEFT)
+
+        self.display_var = tk.StringVar(value=self.display_interpolation)
+        display_menu = tk.OptionMenu(display_frame, self.display_var,
+                                     *DISPLAY_INTERPOLATION,
+                                     command=self.update_display_interpolation)
+        display_menu.config(bg='#0f3460', fg='#00fff5',
+                            activebackground='#16213e',
+                            highlightthickness=0)
+        display_menu.pack(side=tk.LEFT, padx=10)
+
     def create_slider(self, parent, label, from_, to, initial, command):
         """Create a styled slider with label"""
         frame = tk.Frame(parent, bg='#16213e')
@@ -279,70 +4016,154 @@ Return to neutral to trigger again!"""
         slider.pack(fill=tk.X)
 
     def update_jump_threshold(self, val):
-        self.jump_threshold = float(val)
+        self.detector.jump_threshold = float(val)
 
     def update_slide_threshold(self, val):
-        self.slide_single_hand_threshold = float(val)
+        self.detector.slide_single_hand_threshold = float(val)
 
     def update_body_angle(self, val):
-        self.slide_body_angle = float(val)
+        self.detector.slide_body_angle = float(val)
 
     def update_tilt_sensitivity(self, val):
-        self.tilt_sensitivity = float(val)
+        self.detector.tilt_sensitivity = float(val)
 
     def update_cooldown(self, val):
-        self.cooldown_time = float(val)
+        self.detector.cooldown_time = float(val)
 
     def toggle_skeleton(self):
         self.show_skeleton = self.skeleton_var.get()
 
+    def toggle_latency_hud(self):
+        self.show_latency_hud = self.latency_hud_var.get()
+
+    def toggle_roi_tracking(self):
+        self.roi_tracker.enabled = self.roi_var.get()
+        if not self.roi_tracker.enabled:
+            self.roi_tracker.reset()
+
+    def toggle_auto_model(self):
+        self.complexity_controller.enabled = self.auto_model_var.get()
+
+    def toggle_predictive(self):
+        self.detector.predictive = self.predictive_var.get()
+        self.detector.predictor.clear()
+
+    def toggle_motion_gate(self):
+        self.motion_gate.enabled = self.motion_gate_var.get()
+        self.motion_gate.reset()
+
+    def update_inference_mode(self, mode):
+        self.inference_scheduler.set_mode(mode)
+
+    def update_display_interpolation(self, name):
+        self.display_interpolation = name
+
+    def update_smoothing_mode(self, mode):
+        self.detector.landmark_buffer.set_mode(mode)
+
     def reset_counter(self):
         """Reset gesture counter"""
-        self.gesture_count = {
-            "JUMP": 0,
-            "SLIDE": 0,
-            "LEFT": 0,
-            "RIGHT": 0
-        }
+        self.detector.reset_counter()
         self.update_counter_display()
 
     def update_counter_display(self):
         """Update counter label"""
+        counts = [f"{name}: {count}" for name, count in self.detector.gesture_count.items()]
         self.counter_label.config(
-            text=f"JUMP: {self.gesture_count['JUMP']} | SLIDE: {self.gesture_count['SLIDE']}\n"
-                 f"LEFT: {self.gesture_count['LEFT']} | RIGHT: {self.gesture_count['RIGHT']}"
+            text="\n".join(" | ".join(counts[i:i + 2]) for i in range(0, len(counts), 2))
         )
 
+        emitter = self.key_emitter
+        output_text = f"Keys sent: {emitter.sent} | Failed: {emitter.send_failures}"
+        if emitter.dropped:
+            output_text += f" | Dropped: {emitter.dropped}"
+        self.output_label.config(text=output_text,
+                                 fg='#ff6b6b' if emitter.send_failures else '#aaaaaa')
+
     def start_camera(self):
-        """Start the webcam and processing loop"""
-        if not self.camera_active:
-            for camera_index in [0, 1, 2]:
-                self.cap = cv2.VideoCapture(camera_index)
-                if self.cap.isOpened():
-                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                    self.cap.set(cv2.CAP_PROP_FPS, 30)
-
-                    self.camera_active = True
-                    self.start_btn.config(state=tk.DISABLED)
-                    self.stop_btn.config(state=tk.NORMAL)
-                    self.status_indicator.config(text="● ONLINE", fg='#00ff00')
-
-                    self.processing_thread = threading.Thread(target=self.capture_loop, daemon=True)
-                    self.processing_thread.start()
-
-                    self.update_ui()
-                    return
+        """Open the webcam off the UI thread, then start the processing loop"""
+        if not self.camera_active and not self.camera_opening:
+            self.camera_opening = True
+            self.camera_probe = None
+            self.start_btn.config(state=tk.DISABLED)
+            self.status_indicator.config(text="● CONNECTING", fg='#ffa500')
+            threading.Thread(target=self.probe_camera, daemon=True).start()
+            self.master.after(20, self.finish_start_camera)
+
+    def probe_camera(self):
+        start = time.perf_counter()
+        try:
+            cap, profile = probe_cameras(cached=load_camera_cache())
+        except Exception as e:
+            print(f"Camera probe error: {e}")
+            cap, profile = None, None
+        self.camera_probe = cap, profile, time.perf_counter() - start
 
+    def finish_start_camera(self):
+        """Poll the camera probe from Tk and start capturing once a device is open"""
+        if self.camera_probe is None:
+            self.master.after(20, self.finish_start_camera)
+            return
+        cap, profile, elapsed = self.camera_probe
+        self.camera_probe = None
+        self.camera_opening = False
+
+        if cap is None:
+            self.start_btn.config(state=tk.NORMAL)
             self.gesture_label.config(text="NO CAMERA")
             self.status_indicator.config(text="● ERROR", fg='#ff0000')
+            return
+        if self.closing:
+            cap.release()
+            return
+
+        print(f"Camera {profile['index']} opened in {elapsed * 1000:.0f} ms")
+        print(f"Capture profile: {describe_capture(profile)}")
+        if profile["buffer_size"] > 1:
+            print(f"Warning: driver keeps {profile['buffer_size']} buffers; frames may queue before they are read")
+        save_camera_cache(profile)
+        self.capture_profile = profile
+        self.capture_label.config(text="Capture: " + describe_capture(profile))
+        self.startup_times["camera"] = elapsed
+        self.update_startup_label()
+
+        if self.record_path:
+            try:
+                self.recorder = LandmarkRecorder(self.record_path, self.detector.gesture_names)
+            except Exception as e:
+                print(f"Recording error: {e}")
+                cap.release()
+                self.start_btn.config(state=tk.NORMAL)
+                self.gesture_label.config(text="RECORDING ERROR")
+                self.status_indicator.config(text="● ERROR", fg='#ff0000')
+                return
+        self.cap = cap
+
+        self.grabber = FrameGrabber(self.cap, driver_timestamps=profile["driver_timestamps"])
+        self.grabber.start()
+        self.frame_buffers.reset()
+        self.frame_times.clear()
+        self.roi_tracker.reset()
+
+        self.camera_active = True
+        self.stop_btn.config(state=tk.NORMAL)
+        self.status_indicator.config(text="● ONLINE", fg='#00ff00')
+        if not self.pose_ready.is_set():
+            self.gesture_label.config(text="LOADING MODEL")
+
+        self.processing_thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.processing_thread.start()
+
+        self.update_ui()
 
     def stop_camera(self):
         """Stop the webcam"""
         if self.camera_active:
             self.camera_active = False
-            time.sleep(0.1)
-
+            self.stop_processing()
+            if self.recorder:
+                self.recorder.close()
+                self.recorder = None
             if self.cap:
                 self.cap.release()
 
@@ -350,244 +4171,194 @@ Return to neutral to trigger again!"""
             self.stop_btn.config(state=tk.DISABLED)
             self.status_indicator.config(text="● OFFLINE", fg='#ff6b6b')
             self.video_canvas.config(image='', text="Camera Stopped")
+            self.photo = None
             self.gesture_label.config(text="IDLE")
 
+    def stop_processing(self):
+        """Stop the grabber and wait for capture_loop, so nothing writes to the recorder after it is closed"""
+        if self.grabber:
+            self.grabber.stop()
+            self.grabber = None
+        if self.processing_thread is not None:
+            self.processing_thread.join(timeout=2.0)
+            if self.processing_thread.is_alive():
+                print("Warning: capture loop did not stop within 2 s")
+            self.processing_thread = None
+
     def reset_calibration(self):
         """Reset body center calibration"""
-        self.neutral_center_x = None
-        self.neutral_shoulder_hip_distance = None
-        self.calibration_frames = []
-        self.landmark_buffer.clear()
+        self.detector.reset_calibration()
         self.gesture_label.config(text="CALIBRATING...")
 
-    def smooth_landmarks(self, landmarks):
-        """Apply temporal smoothing using moving average"""
-        self.landmark_buffer.append(landmarks)
-
-        if len(self.landmark_buffer) < 3:
-            return landmarks
-
-        smoothed = {}
-        for key in landmarks.keys():
-            smoothed[key] = {
-                'x': np.mean([frame[key]['x'] for frame in self.landmark_buffer]),
-                'y': np.mean([frame[key]['y'] for frame in self.landmark_buffer]),
-                'z': np.mean([frame[key]['z'] for frame in self.landmark_buffer]) if 'z' in landmarks[key] else 0,
-                'visibility': landmarks[key]['visibility']
-            }
-        return smoothed
-
-    def calibrate_neutral_position(self, body_center_x, shoulder_hip_dist):
-        """Calibrate the neutral body position"""
-        if self.neutral_center_x is None or self.neutral_shoulder_hip_distance is None:
-            self.calibration_frames.append((body_center_x, shoulder_hip_dist))
-            if len(self.calibration_frames) >= 30:
-                centers, dists = zip(*self.calibration_frames)
-                self.neutral_center_x = np.mean(centers)
-                self.neutral_shoulder_hip_distance = np.mean(dists)
-                self.calibration_frames = []
-
-    def calculate_body_angle(self, shoulder_y, hip_y, shoulder_z, hip_z):
-        """Calculate body forward bend angle"""
-        vertical_dist = abs(hip_y - shoulder_y)
-        depth_dist = abs(hip_z - shoulder_z)
-
-        if vertical_dist > 0.01:
-            angle = np.degrees(np.arctan(depth_dist / vertical_dist))
-            return angle
-        return 0
-
-    def detect_gesture(self, landmarks):
-        """Enhanced gesture detection with single press logic"""
-        try:
-            # Extract key landmarks
-            left_wrist = landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value]
-            right_wrist = landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST.value]
-            left_shoulder = landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value]
-            right_shoulder = landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value]
-            left_hip = landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value]
-            right_hip = landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value]
-
-            if (left_shoulder.visibility < 0.3 or right_shoulder.visibility < 0.3 or
-                left_hip.visibility < 0.3 or right_hip.visibility < 0.3):
-                # Reset all gesture states when pose not detected
-                for key in self.gesture_states:
-                    self.gesture_states[key] = False
-                return "IDLE", 0
-
-            # Calculate key positions
-            shoulder_center_y = (left_shoulder.y + right_shoulder.y) / 2
-            shoulder_center_z = (left_shoulder.z + right_shoulder.z) / 2
-            hip_center_y = (left_hip.y + right_hip.y) / 2
-            hip_center_z = (left_hip.z + right_hip.z) / 2
-            hip_y = hip_center_y
-            body_center_x = (left_shoulder.x + right_shoulder.x) / 2
-
-            shoulder_hip_distance = np.sqrt(
-                (shoulder_center_y - hip_center_y)**2 +
-                (shoulder_center_z - hip_center_z)**2
-            )
-
-            body_angle = self.calculate_body_angle(shoulder_center_y, hip_center_y,
-                                                   shoulder_center_z, hip_center_z)
-
-            # Smooth landmarks
-            landmark_dict = {
-                'left_wrist': {'x': left_wrist.x, 'y': left_wrist.y, 'z': left_wrist.z, 'visibility': left_wrist.visibility},
-                'right_wrist': {'x': right_wrist.x, 'y': right_wrist.y, 'z': right_wrist.z, 'visibility': right_wrist.visibility},
-                'shoulder_center': {'x': body_center_x, 'y': shoulder_center_y, 'z': shoulder_center_z, 'visibility': 1.0},
-                'hip': {'x': body_center_x, 'y': hip_y, 'z': hip_center_z, 'visibility': 1.0}
-            }
-            smoothed = self.smooth_landmarks(landmark_dict)
-
-            self.calibrate_neutral_position(smoothed['shoulder_center']['x'], shoulder_hip_distance)
+    def capture_loop(self):
+        """Separate thread for pose inference on the newest grabbed frame"""
+        grabber = self.grabber
+        recorder = self.recorder
+        tracker = self.latency_tracker
+        buffers = self.frame_buffers
+        last_processed_time = None
+        pose_landmarks = None
+        inference_time = 0.0
+        crop = None
+        self.extrapolator.clear()
+        self.motion_gate.reset()
 
-            if self.neutral_center_x is None or self.neutral_shoulder_hip_distance is None:
-                return "CALIBRATING", body_angle
+        # The Pose graph may still be warming up on a fresh start
+        while self.camera_active and not self.pose_ready.wait(0.1):
+            pass
 
-            current_time = time.time()
+        while self.camera_active:
+            try:
+                frame, capture_time = grabber.read()
+                if frame is None:
+                    continue
+                if grabber.driver_timestamps:
+                    tracker.record("driver", grabber.last_driver_delay)
+                tracker.record("queue", time.time() - capture_time)
 
-            # JUMP Detection
-            jump_detected = (smoothed['left_wrist']['y'] < smoothed['shoulder_center']['y'] - self.jump_threshold and
-                           smoothed['right_wrist']['y'] < smoothed['shoulder_center']['y'] - self.jump_threshold and
-                           left_wrist.visibility > 0.4 and right_wrist.visibility > 0.4)
+                # Swap in a warmed-up graph if the latency budget asked for another tier
+                new_pose = self.complexity_controller.take_ready_pose()
+                if new_pose is not None:
+                    old_pose, self.pose = self.pose, new_pose
+                    old_pose.close()
+                    self.roi_tracker.region = None
 
-            if jump_detected and not self.gesture_states["JUMP"]:
-                if current_time - self.last_gesture_time >= self.cooldown_time:
-                    self.gesture_states["JUMP"] = True
-                    self.last_gesture_time = current_time
-                    self.gesture_count["JUMP"] += 1
-                    try:
-                        self.keyboard.press(Key.up)
-                        self.keyboard.release(Key.up)
-                    except:
-                        pass
-                    return "JUMP", body_angle
-            elif not jump_detected:
-                self.gesture_states["JUMP"] = False
-
-            # SLIDE Detection
-            left_hand_down = (left_wrist.visibility > 0.4 and
-                             smoothed['left_wrist']['y'] > smoothed['hip']['y'] + self.slide_single_hand_threshold)
-            right_hand_down = (right_wrist.visibility > 0.4 and
-                              smoothed['right_wrist']['y'] > smoothed['hip']['y'] + self.slide_single_hand_threshold)
-            body_bent = body_angle > self.slide_body_angle
-
-            body_compressed = False
-            if self.neutral_shoulder_hip_distance:
-                compression_ratio = shoulder_hip_distance / self.neutral_shoulder_hip_distance
-                body_compressed = compression_ratio < 0.85
-
-            slide_detected = left_hand_down or right_hand_down or body_bent or body_compressed
-
-            if slide_detected and not self.gesture_states["SLIDE"]:
-                if current_time - self.last_gesture_time >= self.cooldown_time:
-                    self.gesture_states["SLIDE"] = True
-                    self.last_gesture_time = current_time
-                    self.gesture_count["SLIDE"] += 1
-                    try:
-                        self.keyboard.press(Key.down)
-                        self.keyboard.release(Key.down)
-                    except:
-                        pass
-                    return "SLIDE", body_angle
-            elif not slide_detected:
-                self.gesture_states["SLIDE"] = False
-
-            # LEFT Detection
-            left_detected = smoothed['shoulder_center']['x'] < self.neutral_center_x - self.tilt_sensitivity
-
-            if left_detected and not self.gesture_states["LEFT"]:
-                if current_time - self.last_gesture_time >= self.cooldown_time:
-                    self.gesture_states["LEFT"] = True
-                    self.last_gesture_time = current_time
-                    self.gesture_count["LEFT"] += 1
-                    try:
-                        self.keyboard.press(Key.left)
-                        self.keyboard.release(Key.left)
-                    except:
-                        pass
-                    return "LEFT", body_angle
-            elif not left_detected:
-                self.gesture_states["LEFT"] = False
-
-            # RIGHT Detection
-            right_detected = smoothed['shoulder_center']['x'] > self.neutral_center_x + self.tilt_sensitivity
-
-            if right_detected and not self.gesture_states["RIGHT"]:
-                if current_time - self.last_gesture_time >= self.cooldown_time:
-                    self.gesture_states["RIGHT"] = True
-                    self.last_gesture_time = current_time
-                    self.gesture_count["RIGHT"] += 1
-                    try:
-                        self.keyboard.press(Key.right)
-                        self.keyboard.release(Key.right)
-                    except:
-                        pass
-                    return "RIGHT", body_angle
-            elif not right_detected:
-                self.gesture_states["RIGHT"] = False
+                frame = buffers.mirror(frame)
 
-            return "IDLE", body_angle
+                # Nothing moved since the last inference: keep its landmarks, the
+                # detector still runs so releases and cooldowns advance
+                still = not self.motion_gate.changed(frame, capture_time)
 
-        except Exception as e:
-            print(f"Gesture detection error: {e}")
-            return "ERROR", 0
+                # Between inferences, detect on landmarks extrapolated from recent velocity;
+                # scheduling and extrapolation run on the monotonic perf_counter clock
+                capture_clock = grabber.last_capture_clock
+                landmarks = None
+                if still:
+                    landmarks = pose_landmarks.landmark if pose_landmarks else None
+                elif not self.inference_scheduler.should_infer(capture_clock):
+                    landmarks = self.extrapolator.predict(capture_clock)
 
-    def capture_loop(self):
-        """Separate thread for camera capture and processing"""
-        while self.camera_active:
-            try:
-                ret, frame = self.cap.read()
-                if not ret:
-                    continue
+                if landmarks is None and not still:
+                    rgb_frame = buffers.to_rgb(frame)
+                    pose_input, crop = self.roi_tracker.prepare(rgb_frame)
+                    preprocess_time = time.time()
+                    tracker.record("preprocess", preprocess_time - capture_time)
 
-                frame = cv2.flip(frame, 1)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    inference_start = time.perf_counter()
+                    results = self.pose.process(pose_input)
+                    inference_time = time.time()
+                    tracker.record("inference", inference_time - capture_time)
+                    self.inference_scheduler.record_inference(inference_start, time.perf_counter())
+                    self.motion_gate.record_inference(preprocess_time, inference_time)
+                    self.roi_tracker.update(results, crop, inference_time - preprocess_time)
+                    self.complexity_controller.observe(
+                        inference_time - preprocess_time, rgb_frame, inference_time,
+                        allow_upgrade=not self.roi_tracker.enabled or self.roi_tracker.scale >= self.roi_tracker.max_scale)
 
-                results = self.pose.process(rgb_frame)
+                    pose_landmarks = results.pose_landmarks
+                    if pose_landmarks:
+                        landmarks = pose_landmarks.landmark
+                        self.extrapolator.update(landmarks, capture_clock)
+                    else:
+                        self.extrapolator.clear()
+                elif not still:
+                    # Skeleton overlay shows the last inferred pose
+                    self.inference_scheduler.extrapolated_frames += 1
 
                 gesture = "IDLE"
                 body_angle = 0
+                fired = ()
 
-                if results.pose_landmarks:
-                    gesture, body_angle = self.detect_gesture(results.pose_landmarks.landmark)
+                if landmarks is not None:
+                    gesture, body_angle = self.detector.detect_gesture(landmarks, capture_time)
+                    fired = self.detector.fired
+                    tracker.record("detect", time.time() - capture_time)
 
-                    if self.show_skeleton:
+                    if self.show_skeleton and pose_landmarks:
                         self.mp_drawing.draw_landmarks(
                             frame,
-                            results.pose_landmarks,
+                            pose_landmarks,
                             self.mp_pose.POSE_CONNECTIONS,
                             landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
                         )
 
+                if recorder:
+                    recorder.write(landmarks, capture_time, inference_time, fired)
+                if self.event_server is not None:
+                    self.event_server.publish_landmarks(landmarks, capture_time, inference_time, fired)
+
                 cv2.putText(frame, gesture, (10, 50), cv2.FONT_HERSHEY_SIMPLEX,
                            1.5, (0, 255, 245), 3, cv2.LINE_AA)
                 cv2.putText(frame, f"Angle: {int(body_angle)}°", (10, 100),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2, cv2.LINE_AA)
+                if self.show_latency_hud:
+                    self.draw_latency_hud(frame, crop)
+                slot = self.render_display(frame)
+                tracker.record("render", time.time() - capture_time)
 
+                now = time.time()
                 with self.frame_lock:
-                    self.current_frame = frame
+                    buffers.published = slot
+                    self.frame_sequence += 1
                     self.current_gesture = gesture
                     self.current_body_angle = body_angle
+                    self.current_capture_time = capture_time
+                    self.frame_latency = now - capture_time
+                    # Pipeline throughput: interval between fully processed frames
+                    if last_processed_time is not None:
+                        self.frame_times.append(now - last_processed_time)
+                last_processed_time = now
+                tracker.record("total", now - capture_time)
+                tracker.set_counter("dropped_frames_total", grabber.dropped_frames)
 
             except Exception as e:
                 print(f"Capture error: {e}")
                 time.sleep(0.1)
 
+    def draw_latency_hud(self, frame, crop=None):
+        """Overlay rolling p50/p95 per stage; stats are refreshed a few times per second"""
+        if crop is not None and crop[2] * crop[3] < 1.0:
+            height, width = frame.shape[:2]
+            x, y, w, h = crop
+            cv2.rectangle(frame, (int(x * width), int(y * height)),
+                          (int((x + w) * width), int((y + h) * height)), (0, 255, 0), 1)
+
+        now = time.time()
+        if now - self.hud_updated > 0.25:
+            self.hud_updated = now
+            self.hud_lines = [f"{stage:<10} p50 {stats['p50']:6.1f}  p95 {stats['p95']:6.1f} ms"
+                              for stage, stats in self.latency_tracker.summary().items()]
+
+        y = frame.shape[0] - 12 - 18 * len(self.hud_lines)
+        for line in self.hud_lines:
+            y += 18
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_PLAIN,
+                       1.1, (0, 255, 0), 1, cv2.LINE_AA)
+
+    def render_display(self, frame):
+        """Scale the annotated frame to fit the canvas into a free display slot (worker thread)"""
+        canvas_width, canvas_height = self.display_size
+        height, width = frame.shape[:2]
+        scale = min(canvas_width / width, canvas_height / height)
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        return self.frame_buffers.render(frame, size, DISPLAY_INTERPOLATION[self.display_interpolation])
+
     def update_ui(self):
         """Update UI with latest frame"""
         if not self.camera_active:
             return
 
         try:
-            start_time = time.time()
-
             with self.frame_lock:
-                if self.current_frame is not None:
-                    frame = self.current_frame.copy()
+                if self.frame_buffers.published >= 0:
+                    # Hold the slot until the next update so the worker renders elsewhere
+                    self.frame_buffers.in_use = self.frame_buffers.published
+                    display = self.frame_buffers.image(self.frame_buffers.in_use)
+                    sequence = self.frame_sequence
                     gesture = self.current_gesture
                     body_angle = getattr(self, 'current_body_angle', 0)
+                    frame_latency = self.frame_latency
+                    frame_interval = sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0
                 else:
                     self.master.after(10, self.update_ui)
                     return
@@ -601,25 +4372,47 @@ Return to neutral to trigger again!"""
                 "CALIBRATING": "#ffa500",
                 "ERROR": "#ff0000"
             }
-            self.gesture_label.config(text=gesture, fg=color_map.get(gesture, "#00fff5"))
+            text = gesture
+            if self.detector.predictive and gesture in self.detector.gesture_count:
+                text = f"{gesture} {self.detector.confidence:.0%}"
+            self.gesture_label.config(text=text, fg=color_map.get(gesture, "#00fff5"))
 
             self.angle_label.config(text=f"Body Angle: {int(body_angle)}°")
 
             # Update counter display
             self.update_counter_display()
 
-            frame_time = time.time() - start_time
-            self.frame_times.append(frame_time)
-            self.fps = int(1.0 / np.mean(self.frame_times)) if len(self.frame_times) > 0 else 0
+            self.fps = int(1.0 / frame_interval) if frame_interval > 0 else 0
             self.fps_label.config(text=f"FPS: {self.fps}")
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            img = img.resize((800, 600), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(image=img)
+            dropped = self.grabber.dropped_frames if self.grabber else 0
+            self.latency_label.config(text=f"Latency: {int(frame_latency * 1000)} ms | Dropped: {dropped}")
 
-            self.video_canvas.config(image=photo, text="")
-            self.video_canvas.image = photo
+            roi_fraction = self.roi_tracker.region_fraction()
+            roi_text = "full" if roi_fraction >= 1.0 else f"{int(roi_fraction * 100)}%"
+            self.roi_label.config(text=f"ROI: {roi_text} | Scale: {self.roi_tracker.scale:.2f}x")
+            model_text = (f"Model: {self.complexity_controller.tier_name()} | "
+                          f"Inferred: {int(self.inference_scheduler.inferred_ratio() * 100)}%")
+            if isinstance(self.pose, InferenceProcess):
+                model_text += f" | Worker restarts: {self.pose.restarts}"
+            self.model_label.config(text=model_text)
+            self.gate_label.config(text=f"Skipped: {int(self.motion_gate.skip_ratio() * 100)}% | "
+                                        f"CPU saved: {int(self.motion_gate.saved_fraction() * 100)}%")
+
+            # Only swap the image; reuse the PhotoImage while the size is unchanged
+            if sequence != self.displayed_sequence:
+                self.displayed_sequence = sequence
+                if self.photo is None or (self.photo.width(), self.photo.height()) != display.size:
+                    self.photo = ImageTk.PhotoImage(image=display)
+                    self.video_canvas.config(image=self.photo, text="")
+                else:
+                    self.photo.paste(display)
+
+            # Let the worker render at the canvas's real size
+            canvas_width = self.video_canvas.winfo_width() - 4
+            canvas_height = self.video_canvas.winfo_height() - 4
+            if canvas_width > 1 and canvas_height > 1:
+                self.display_size = (canvas_width, canvas_height)
 
         except Exception as e:
             print(f"UI update error: {e}")
@@ -628,19 +4421,166 @@ Return to neutral to trigger again!"""
 
     def cleanup(self):
         """Clean up resources"""
+        self.closing = True
         self.camera_active = False
-        time.sleep(0.2)
-
+        self.stop_processing()
+        if self.recorder:
+            self.recorder.close()
+        self.key_emitter.stop()
+        if self.log_hotkey is not None:
+            self.log_hotkey.stop()
+        if self.event_server is not None:
+            self.event_server.stop()
+        if self.latency_tracker.export_thread:
+            self.latency_tracker.stop_export()
         if self.cap:
             self.cap.release()
         if self.pose:
             self.pose.close()
+        self.complexity_controller.discard()
+        if self.profile_path:
+            try:
+                if self.detector.save_profile(self.profile_path):
+                    print(f"Saved calibration profile {self.profile_path}")
+            except Exception as e:
+                print(f"Profile save error: {e}")
         cv2.destroyAllWindows()
 
 
-def main():
+def run_replay(args):
+    """Headless replay entry point; prints a summary and the emitted gestures"""
+    sink = RecordingSink()
+    rules = GestureRuleEngine.load(args.rules) if args.rules else None
+    detector = GestureDetector(key_sink=sink, rules=rules, predictive=args.predictive)
+    if args.session_log:
+        detector.session_log = sink.session_log = SessionLog()
+    if args.profile:
+        detector.load_profile(calibration_profile_path(args.profile))
+    pipeline = HeadlessPipeline(detector,
+                                model_complexity=args.model_complexity,
+                                mirror=not args.no_mirror)
+    try:
+        stats = pipeline.run(args.replay, max_frames=args.max_frames)
+    finally:
+        pipeline.close()
+
+    if args.session_log:
+        path = detector.dump_session_log(session_log_path(args.session_log), source="replay", replay=args.replay)
+        print(f"Session log written to {path}")
+
+    if args.events:
+        for timestamp, gesture, key in sink.events:
+            print(f"{timestamp:9.3f}s  {gesture:<6} {key}")
+
+    print(f"Frames: {stats['frames']} (pose in {stats['pose_frames']})")
+    print(f"Elapsed: {stats['elapsed']:.2f}s | {stats['fps']:.1f} FPS")
+    print("Gestures: " + " | ".join(f"{g}: {n}" for g, n in stats['gesture_count'].items()))
+
+
+def run_event_client(url):
+    """Print gestures and a per-second landmark packet summary from an event server"""
+    client = EventClient(url)
+    print(f"Subscribed to {url}")
+    last_sequence = gestures = None
+    packets = missed = 0
+    report_time = time.time()
+    try:
+        while True:
+            packet = client.receive()
+            now = time.time()
+            if packet is not None and packet["type"] == "hello":
+                if packet["gestures"] != gestures:  # UDP subscribers get one with every refresh
+                    gestures = packet["gestures"]
+                    print(f"Gestures: {', '.join(gestures) or 'none'}")
+            elif packet is not None:
+                if last_sequence is not None:
+                    missed += max(0, packet["sequence"] - last_sequence - 1)
+                last_sequence = packet["sequence"]
+                if packet["type"] == "gesture":
+                    print(f"#{packet['sequence']:<8} {packet['gesture']:<6} {packet['key']:<6} "
+                          f"{(now - packet['timestamp']) * 1000:6.1f} ms after capture")
+                else:
+                    packets += 1
+            if now - report_time >= 1.0:
+                print(f"landmark packets/s: {packets / (now - report_time):.1f} | missed: {missed}")
+                packets = 0
+                report_time = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Temple Run Body Controller")
+    parser.add_argument("--daemon", metavar="CONFIG",
+                        help="run headless from a config file (.json/.yaml): camera, thresholds, key bindings")
+    parser.add_argument("--sessions", metavar="CONFIG",
+                        help="multi-session mode: one camera, core and key mapping per player, from a config file")
+    parser.add_argument("--no-window", action="store_true",
+                        help="with --sessions, print session status to the console instead of opening a window")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="run headless on a video file or recorded landmarks (.gxl/.npy/.npz)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="append every processed frame's landmarks to a .gxl recording")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="export stage latencies to a .csv file or a Prometheus text file (.prom)")
+    parser.add_argument("--metrics-interval", type=float, default=5.0,
+                        help="seconds between metrics exports")
+    parser.add_argument("--inference-process", action="store_true",
+                        help="run MediaPipe inference in a separate, supervised process")
+    parser.add_argument("--key-output", choices=KEY_BACKENDS, default="pynput",
+                        help="where gesture keys are sent")
+    parser.add_argument("--key-target", metavar="TARGET",
+                        help="events file for --key-output record, HOST:PORT for --key-output socket")
+    parser.add_argument("--event-server", metavar="URL",
+                        help="publish gestures and landmarks on udp://HOST:PORT, unix:///PATH or ws://HOST:PORT")
+    parser.add_argument("--event-client", metavar="URL",
+                        help="subscribe to a running event server and print what it publishes")
+    parser.add_argument("--rules", metavar="PATH",
+                        help="gesture rules file (.json, or .yaml with PyYAML installed)")
+    parser.add_argument("--profile", metavar="NAME",
+                        help="per-user calibration profile (~/.gesturex/profiles/NAME.json or a .json path); "
+                             "loaded at start, saved on exit")
+    parser.add_argument("--predictive", action="store_true",
+                        help="fire JUMP/SLIDE early from landmark velocity and acceleration")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2), default=1,
+                        help="MediaPipe Pose model complexity for video replay")
+    parser.add_argument("--no-mirror", action="store_true",
+                        help="do not flip replayed video horizontally")
+    parser.add_argument("--max-frames", type=int, default=None,
+                        help="stop the replay or daemon after this many frames")
+    parser.add_argument("--session-log", metavar="PATH",
+                        help="directory or .npz file for session log dumps (F9 in the app, end of a --replay; "
+                             "--daemon uses session_log from its config); default ~/.gesturex/logs")
+    parser.add_argument("--events", action="store_true",
+                        help="print every gesture emitted during the replay")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        run_replay(args)
+        return
+    if args.event_client:
+        run_event_client(args.event_client)
+        return
+    if args.daemon:
+        run_daemon(args.daemon, max_frames=args.max_frames)
+        return
+    if args.sessions:
+        run_sessions(args.sessions, window=not args.no_window)
+        return
+    if tk is None:
+        parser.error("tkinter is not installed; use --daemon or --replay to run without a window")
+
     root = tk.Tk()
-    app = TempleRunController(root)
+    app = TempleRunController(root, record_path=args.record,
+                              metrics_path=args.metrics, metrics_interval=args.metrics_interval,
+                              inference_process=args.inference_process,
+                              key_backend=create_key_backend(args.key_output, args.key_target),
+                              rules=GestureRuleEngine.load(args.rules) if args.rules else None,
+                              predictive=args.predictive, profile=args.profile,
+                              event_server=EventServer(args.event_server) if args.event_server else None,
+                              session_log=args.session_log)
 
     def on_closing():
         app.cleanup()
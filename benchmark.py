@@ -0,0 +1,382 @@
+"""
+GestureX Pipeline Benchmark
+Times every capture -> inference -> UI stage separately on synthetic or recorded frames
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import GestureX as gx
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+
+# Neutral standing pose used for synthetic landmarks (x, y, z, visibility)
+NEUTRAL_POSE = {
+    0: (0.50, 0.20, -0.30),                          # nose
+    11: (0.44, 0.35, -0.03), 12: (0.56, 0.35, -0.03),  # shoulders
+    13: (0.40, 0.48, -0.05), 14: (0.60, 0.48, -0.05),  # elbows
+    15: (0.39, 0.60, -0.05), 16: (0.61, 0.60, -0.05),  # wrists
+    23: (0.46, 0.65, 0.00), 24: (0.54, 0.65, 0.00),    # hips
+    25: (0.46, 0.80, 0.02), 26: (0.54, 0.80, 0.02),    # knees
+    27: (0.46, 0.95, 0.05), 28: (0.54, 0.95, 0.05)     # ankles
+}
+
+
+def synthetic_landmarks(count, seed=0):
+    """Jittered neutral poses as (count, 33, 4) landmark arrays"""
+    rng = np.random.default_rng(seed)
+    base = np.zeros((gx.NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+    base[:, :3] = (0.5, 0.5, 0.0)
+    for index, (x, y, z) in NEUTRAL_POSE.items():
+        base[index, :3] = (x, y, z)
+    base[:, 3] = 0.99
+    landmarks = np.repeat(base[None], count, axis=0)
+    landmarks[:, :, :3] += rng.normal(0, 0.004, size=(count, gx.NUM_POSE_LANDMARKS, 3))
+    return landmarks
+
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    """Noisy BGR frames with a moving block so consecutive frames differ"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = (i * 7) % (width - 120)
+        frame[140:340, x:x + 120] = (40, 90, 200)
+        frames.append(frame)
+    return frames
+
+
+def video_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    if not frames:
+        raise ValueError(f"No frames decoded from {path}")
+    return frames
+
+
+def time_stage(fn, inputs, warmup=5):
+    """Run fn over every input and return per-call latencies in seconds"""
+    for item in inputs[:warmup]:
+        fn(item)
+    samples = np.empty(len(inputs), dtype=np.float64)
+    for i, item in enumerate(inputs):
+        start = time.perf_counter()
+        fn(item)
+        samples[i] = time.perf_counter() - start
+    return samples
+
+
+def summarize(samples):
+    mean = float(np.mean(samples))
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "samples": int(len(samples)),
+        "throughput_fps": 1.0 / mean if mean > 0 else 0.0,
+        "mean_ms": mean * 1000,
+        "p50_ms": float(p50) * 1000,
+        "p95_ms": float(p95) * 1000,
+        "p99_ms": float(p99) * 1000
+    }
+
+
+def run_benchmarks(frames, landmarks, complexities, display_size=(800, 600)):
+    """Time each pipeline stage; returns {stage: summary}"""
+    results = {}
+    rgb_frames = [cv2.cvtColor(cv2.flip(f, 1), cv2.COLOR_BGR2RGB) for f in frames]
+
+    results["flip"] = summarize(time_stage(lambda f: cv2.flip(f, 1), frames))
+    results["cvtColor"] = summarize(time_stage(lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2RGB), frames))
+
+    for complexity in complexities:
+        pose = gx.create_pose(model_complexity=complexity)
+        try:
+            results[f"pose_process_c{complexity}"] = summarize(time_stage(pose.process, rgb_frames))
+        finally:
+            pose.close()
+
+    # Gesture detection on landmark objects, after calibration has settled
+    detector = gx.GestureDetector(key_sink=gx.NullSink())
+    landmark_objects = [gx.landmarks_from_array(a) for a in landmarks]
+    for i, lm in enumerate(landmark_objects[:40]):
+        detector.detect_gesture(lm, i / 30)
+    clock = [10.0]
+
+    def detect(lm):
+        clock[0] += 1 / 30
+        detector.detect_gesture(lm, clock[0])
+    results["detect_gesture"] = summarize(time_stage(detect, landmark_objects))
+
+    import mediapipe as mp
+    mp_pose = mp.solutions.pose
+    mp_drawing = mp.solutions.drawing_utils
+    style = mp.solutions.drawing_styles.get_default_pose_landmarks_style()
+    landmark_lists = [gx.landmark_list_from_array(a) for a in landmarks]
+    pairs = [(frames[i % len(frames)].copy(), landmark_lists[i]) for i in range(len(landmark_lists))]
+    results["draw_landmarks"] = summarize(time_stage(
+        lambda p: mp_drawing.draw_landmarks(p[0], p[1], mp_pose.POSE_CONNECTIONS,
+                                            landmark_drawing_spec=style), pairs))
+
+    def put_text(frame):
+        cv2.putText(frame, "JUMP", (10, 50), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.5, (0, 255, 245), 3, cv2.LINE_AA)
+        cv2.putText(frame, "Angle: 12°", (10, 100),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2, cv2.LINE_AA)
+    results["putText"] = summarize(time_stage(put_text, [f.copy() for f in frames]))
+
+    results["resize_lanczos"] = summarize(time_stage(
+        lambda f: Image.fromarray(f).resize(display_size, Image.Resampling.LANCZOS), rgb_frames))
+
+    # Worker-side render stage used by the app: resize into a reused buffer, then RGBA into a display slot
+    render_buffers = gx.FrameBuffers()
+
+    def render_display(frame):
+        render_buffers.published = render_buffers.render(frame, display_size, gx.DISPLAY_INTERPOLATION["Linear"])
+    results["render_linear"] = summarize(time_stage(render_display, frames))
+
+    # PhotoImage needs a Tk interpreter; skipped on machines without a display
+    try:
+        import tkinter as tk
+        from PIL import ImageTk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        print(f"Skipping PhotoImage stage: {e}")
+    else:
+        try:
+            images = [Image.fromarray(f).resize(display_size, Image.Resampling.LANCZOS) for f in rgb_frames]
+            results["photoimage"] = summarize(time_stage(lambda img: ImageTk.PhotoImage(image=img), images))
+        finally:
+            root.destroy()
+
+    return results
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture stand-in that decodes into the caller's buffer like the real read(image)"""
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def read(self, image=None):
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if image is None:
+            return True, frame.copy()
+        np.copyto(image, frame)
+        return True, image
+
+    def get(self, prop):
+        return 0.0
+
+
+def frame_allocations(step, count, warmup=5):
+    """Peak bytes allocated above the steady state inside each call of step()"""
+    for _ in range(warmup):
+        step()
+    tracemalloc.start()
+    samples = np.empty(count, dtype=np.int64)
+    try:
+        for i in range(count):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            step()
+            samples[i] = tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return samples
+
+
+def allocation_check(frames, count, display_size=(800, 600)):
+    """Per-frame allocations of the app's frame loop, buffered vs. the old allocating path"""
+    interpolation = gx.DISPLAY_INTERPOLATION["Linear"]
+
+    grabber = gx.FrameGrabber(SyntheticCapture(frames))
+    buffers = gx.FrameBuffers()
+    roi = gx.PoseRegionTracker()
+    roi.region = (0.2, 0.1, 0.8, 0.9)
+
+    def buffered():
+        grabber.grab()
+        frame, _ = grabber.read(timeout=0)
+        frame = buffers.mirror(frame)
+        roi.prepare(buffers.to_rgb(frame))
+        buffers.published = buffers.render(frame, display_size, interpolation)
+
+    capture = SyntheticCapture(frames)
+    legacy_roi = gx.PoseRegionTracker()
+    legacy_roi.region = roi.region
+
+    def allocating():
+        _, frame = capture.read()
+        frame = cv2.flip(frame, 1)
+        legacy_roi.prepare(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        resized = cv2.resize(frame, display_size, interpolation=interpolation)
+        Image.fromarray(cv2.cvtColor(resized, cv2.COLOR_BGR2RGB))
+
+    return {"buffered": frame_allocations(buffered, count),
+            "allocating": frame_allocations(allocating, count)}
+
+
+def scaling_worker(core, count, complexity, start, results):
+    """One multi-session worker: Pose on synthetic frames, pinned like a session process"""
+    gx.pin_to_core(core)
+    rgb_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in synthetic_frames(min(count, 30), seed=core)]
+    pose = gx.create_pose(model_complexity=complexity)
+    try:
+        for frame in rgb_frames[:5]:
+            pose.process(frame)
+        start.wait()
+        began = time.perf_counter()
+        for i in range(count):
+            pose.process(rgb_frames[i % len(rgb_frames)])
+        results.put((count, time.perf_counter() - began))
+    finally:
+        pose.close()
+
+
+def scaling_check(max_sessions, count, complexity):
+    """Aggregate Pose throughput with 1..max_sessions pinned processes, as in --sessions mode"""
+    context = multiprocessing.get_context("spawn")
+    cores = gx.available_cores()
+    rows = []
+    for sessions in range(1, max_sessions + 1):
+        start = context.Event()
+        results = context.Queue()
+        workers = [context.Process(target=scaling_worker,
+                                   args=(cores[i % len(cores)], count, complexity, start, results))
+                   for i in range(sessions)]
+        for worker in workers:
+            worker.start()
+        start.set()
+        finished = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        fps = sum(frames for frames, _ in finished) / max(elapsed for _, elapsed in finished)
+        rows.append((sessions, fps, fps / (sessions * rows[0][1]) if rows else 1.0))
+    return rows
+
+
+def compare(results, baseline, tolerance):
+    """Return stages whose p50 got slower than the baseline by more than tolerance"""
+    regressions = []
+    for stage, summary in results.items():
+        base = baseline.get(stage)
+        if base and summary["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append((stage, base["p50_ms"], summary["p50_ms"]))
+    return regressions
+
+
+def print_report(results, baseline=None):
+    print(f"{'stage':<18}{'fps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'vs base':>10}")
+    for stage, r in results.items():
+        change = ""
+        if baseline and stage in baseline:
+            change = f"{(r['p50_ms'] / baseline[stage]['p50_ms'] - 1) * 100:+.0f}%"
+        print(f"{stage:<18}{r['throughput_fps']:>10.1f}{r['p50_ms']:>10.3f}"
+              f"{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage GestureX pipeline benchmark")
+    parser.add_argument("--frames", type=int, default=200, help="frames per stage")
+    parser.add_argument("--video", help="benchmark on frames from a recorded video instead of synthetic ones")
+    parser.add_argument("--landmarks", help="recorded landmarks (.gxl/.npy/.npz) for detect_gesture and drawing")
+    parser.add_argument("--complexity", type=int, nargs="*", choices=(0, 1, 2), default=[0, 1, 2],
+                        help="Pose model complexities to time (none to skip pose)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed p50 slowdown vs baseline before reporting a regression")
+    parser.add_argument("--alloc-check", action="store_true",
+                        help="measure per-frame allocations of the frame loop with tracemalloc instead of timing")
+    parser.add_argument("--alloc-limit", type=int, default=16384,
+                        help="bytes per frame the buffered frame loop may allocate before --alloc-check fails")
+    parser.add_argument("--scaling", type=int, metavar="N",
+                        help="measure aggregate Pose throughput with 1..N pinned session processes instead")
+    parser.add_argument("--scaling-limit", type=float, default=0.8,
+                        help="lowest scaling efficiency (fps / (n * single-session fps)) --scaling accepts")
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        complexity = args.complexity[0] if args.complexity else 1
+        rows = scaling_check(args.scaling, args.frames, complexity)
+        print(f"{'sessions':<10}{'total fps':>12}{'per session':>14}{'efficiency':>12}")
+        for sessions, fps, efficiency in rows:
+            print(f"{sessions:<10}{fps:>12.1f}{fps / sessions:>14.1f}{efficiency:>11.0%}")
+        worst = min(efficiency for _, _, efficiency in rows)
+        if worst < args.scaling_limit:
+            print(f"SCALING efficiency {worst:.0%} < {args.scaling_limit:.0%}")
+            return 1
+        return 0
+
+    frames = video_frames(args.video, args.frames) if args.video else synthetic_frames(args.frames)
+    if args.alloc_check:
+        samples = allocation_check(frames, args.frames)
+        print(f"{'path':<12}{'mean B':>12}{'p95 B':>12}{'max B':>12}")
+        for path, allocated in samples.items():
+            print(f"{path:<12}{np.mean(allocated):>12.0f}{np.percentile(allocated, 95):>12.0f}"
+                  f"{allocated.max():>12}")
+        peak = int(np.percentile(samples["buffered"], 95))
+        if peak > args.alloc_limit:
+            print(f"ALLOCATION buffered frame loop: p95 {peak} B per frame > {args.alloc_limit} B")
+            return 1
+        return 0
+    if args.landmarks:
+        landmarks, _ = gx.load_landmark_stream(args.landmarks)
+        landmarks = np.asarray(landmarks[:args.frames])
+        landmarks = landmarks[~np.isnan(landmarks[:, 0, 0])]
+    else:
+        landmarks = synthetic_landmarks(args.frames)
+
+    print(f"Benchmarking {len(frames)} {'recorded' if args.video else 'synthetic'} frames, "
+          f"{len(landmarks)} landmark sets")
+    results = run_benchmarks(frames, landmarks, args.complexity)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["stages"]
+
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "frames": len(frames),
+                       "source": args.video or "synthetic",
+                       "stages": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for stage, before, after in regressions:
+            print(f"REGRESSION {stage}: p50 {before:.3f} ms -> {after:.3f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+GestureX Landmark Extraction
+Runs recorded gameplay videos through Pose across a process pool and writes one .gxl recording per video
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+import GestureX as gx
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+
+# Frames between progress messages from a worker
+PROGRESS_EVERY = 30
+
+# Per-worker state, set up once by init_worker
+POSE = None
+PROGRESS = None
+MIRROR = True
+
+
+def find_videos(paths):
+    """Video files given directly or found recursively under directories"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                videos += [os.path.join(directory, name) for name in sorted(names)
+                           if name.lower().endswith(VIDEO_EXTENSIONS)]
+        else:
+            videos.append(path)
+    return videos
+
+
+def output_path_for(video, output_dir=None):
+    name = os.path.splitext(os.path.basename(video))[0] + ".gxl"
+    return os.path.join(output_dir or os.path.dirname(video), name)
+
+
+def video_frame_count(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        return max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    finally:
+        cap.release()
+
+
+def recorded_frames(path):
+    """Whole records in a partial recording"""
+    if not os.path.exists(path):
+        return 0
+    return gx.recording_frames(path)
+
+
+def prepare_partial(path):
+    """Drop a partial recording cut off inside its header, or left by an older format; returns the frames it holds
+
+    LandmarkRecorder cuts a half-written last record off before appending.
+    """
+    if os.path.exists(path):
+        try:
+            if gx.read_recording_header(path)[2] is not gx.RECORDING_RECORD:
+                os.remove(path)
+        except ValueError:
+            os.remove(path)
+    return recorded_frames(path)
+
+
+def init_worker(model_complexity, mirror, progress):
+    """One Pose graph per worker process, reused for every video it gets"""
+    global POSE, PROGRESS, MIRROR
+    cv2.setNumThreads(1)  # the pool already uses every core
+    POSE = gx.create_pose(model_complexity)
+    PROGRESS = progress
+    MIRROR = mirror
+
+
+def extract_video(video, output):
+    """Stream one video through Pose into `output`; resumes an interrupted .partial file
+
+    Returns (video, first frame of this run, frames extracted, pose frames, seconds spent).
+    """
+    partial = output + ".partial"
+    start_frame = prepare_partial(partial)
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    recorder = gx.LandmarkRecorder(partial)
+    start_time = time.perf_counter()
+    frames = pose_frames = reported = 0
+    buffers = gx.FrameBuffers()
+    try:
+        # Skip what an earlier run already wrote; grab() does not decode
+        for _ in range(start_frame):
+            if not cap.grab():
+                break
+        frame_index = start_frame
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if MIRROR:
+                frame = buffers.mirror(frame)
+            rgb_frame = buffers.to_rgb(frame)
+            inference_start = time.perf_counter()
+            results = POSE.process(rgb_frame)
+            capture_time = frame_index / fps
+
+            landmarks = results.pose_landmarks.landmark if results.pose_landmarks else None
+            pose_frames += landmarks is not None
+            recorder.write(landmarks, capture_time, capture_time + time.perf_counter() - inference_start)
+            frame_index += 1
+            frames += 1
+            if frames - reported >= PROGRESS_EVERY:
+                PROGRESS.put(frames - reported)
+                reported = frames
+    finally:
+        cap.release()
+        recorder.close()
+        PROGRESS.put(frames - reported)
+
+    os.replace(partial, output)
+    return video, start_frame, frames, pose_frames, time.perf_counter() - start_time
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract GestureX landmark recordings from videos in parallel")
+    parser.add_argument("videos", nargs="+", help="video files or directories to search recursively")
+    parser.add_argument("--output", metavar="DIR", help="directory for the .gxl files (default: next to each video)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, one Pose graph each")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2), default=1,
+                        help="MediaPipe Pose model complexity")
+    parser.add_argument("--no-mirror", action="store_true",
+                        help="do not flip frames horizontally (the live app mirrors the camera)")
+    parser.add_argument("--overwrite", action="store_true", help="extract again even if a .gxl file exists")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="seconds between progress reports")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    skipped = 0
+    for video in find_videos(args.videos):
+        output = output_path_for(video, args.output)
+        if os.path.exists(output) and not args.overwrite:
+            skipped += 1
+            continue
+        if args.overwrite and os.path.exists(output + ".partial"):
+            os.remove(output + ".partial")
+        remaining = video_frame_count(video) - prepare_partial(output + ".partial")
+        jobs.append((video, output, max(remaining, 0)))
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    if not jobs:
+        print(f"Nothing to extract ({skipped} already done)")
+        return 0
+
+    # Longest videos first, so one long file does not finish alone at the end
+    jobs.sort(key=lambda job: -job[2])
+    total_frames = sum(job[2] for job in jobs)
+    print(f"Extracting {len(jobs)} videos ({total_frames} frames, {skipped} already done) "
+          f"with {args.workers} workers")
+
+    progress = multiprocessing.Queue()
+    failed = 0
+    done_frames = 0
+    start = report_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.model_complexity, not args.no_mirror, progress)) as pool:
+        futures = {pool.submit(extract_video, video, output): video for video, output, _ in jobs}
+        pending = set(futures)
+        while pending:
+            try:
+                done_frames += progress.get(timeout=0.5)
+            except queue.Empty:
+                pass
+
+            for future in [f for f in pending if f.done()]:
+                pending.discard(future)
+                try:
+                    video, start_frame, frames, pose_frames, elapsed = future.result()
+                    resumed = f" (resumed at frame {start_frame})" if start_frame else ""
+                    print(f"done  {video}: {frames} frames{resumed}, pose in {pose_frames}, "
+                          f"{frames / elapsed if elapsed > 0 else 0:.1f} FPS")
+                except Exception as e:
+                    failed += 1
+                    print(f"error {futures[future]}: {e}")
+
+            now = time.perf_counter()
+            if now - report_time >= args.report_interval:
+                report_time = now
+                rate = done_frames / (now - start)
+                remaining = max(total_frames - done_frames, 0) / rate if rate > 0 else float("inf")
+                print(f"{done_frames}/{total_frames} frames | {rate:.1f} FPS | "
+                      f"{len(jobs) - len(pending)}/{len(jobs)} videos | "
+                      f"ETA {format_duration(remaining) if rate > 0 else '?'}")
+
+    while True:
+        try:
+            done_frames += progress.get_nowait()
+        except queue.Empty:
+            break
+    elapsed = time.perf_counter() - start
+    print(f"Finished {len(jobs) - failed}/{len(jobs)} videos, {done_frames} frames in {format_duration(elapsed)} "
+          f"({done_frames / elapsed if elapsed > 0 else 0:.1f} FPS)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
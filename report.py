@@ -0,0 +1,171 @@
+"""
+GestureX Session Report
+Explains missed and late gestures from a session log dump: detection, cooldown or key output
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+import GestureX as gx
+
+OUTCOME_NAMES = {gx.KEY_SENT: "sent", gx.KEY_FAILED: "FAILED", gx.KEY_DROPPED: "DROPPED"}
+
+
+def load_session_log(path):
+    with np.load(path) as data:
+        log = {name: data[name] for name in data.files if name != "metadata"}
+        log["metadata"] = json.loads(str(data["metadata"]))
+    return log
+
+
+def runs(mask):
+    """(start, end) index pairs of consecutive True values, end exclusive"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def percentiles(values_ms):
+    if len(values_ms) == 0:
+        return "-"
+    p50, p95 = np.percentile(values_ms, (50, 95))
+    return f"{p50:.0f}/{p95:.0f}"
+
+
+def analyze(log, near=0.8):
+    """Per-gesture fired, cooldown-suppressed, near-miss and key output counts, plus a timeline
+
+    A suppression is one run of frames whose trigger held while the gesture's
+    cooldown blocked it. A near miss is a run of frames where the gesture's
+    progress reached `near` of its threshold without firing or being blocked.
+    """
+    metadata = log["metadata"]
+    capture = log["times"][:, 0]
+    detecting = log["status"] == gx.LOG_DETECTING
+    features = {name: log["features"][:, i] for i, name in enumerate(metadata["features"])}
+    live = metadata.get("source") != "replay"
+    start = capture[0] if len(capture) else 0.0
+
+    gestures = {}
+    events = []
+    for k, name in enumerate(metadata["rules"]):
+        bit = 1 << k
+        held = (log["flags"][:, 0] & bit) != 0
+        fired = np.flatnonzero(log["flags"][:, 1] & bit)
+        blocked = (log["flags"][:, 2] & bit) != 0
+        suppressed = runs(blocked)
+
+        near_misses = []
+        progress = features.get(f"{name.lower()}_progress")
+        if progress is not None:
+            for begin, end in runs(detecting & (np.nan_to_num(progress) >= near)):
+                if not (held[begin:end].any() or blocked[begin:end].any()):
+                    near_misses.append((begin, float(np.max(progress[begin:end]))))
+
+        keys = log["key_info"][:, 0] == k
+        outcomes = log["key_info"][keys, 1]
+        key_times = log["key_times"][keys]
+        sent = outcomes == gx.KEY_SENT
+        gestures[name] = {
+            "fired": len(fired),
+            "suppressed": len(suppressed),
+            "blocked_frames": int(blocked.sum()),
+            "near_misses": len(near_misses),
+            "keys_sent": int(sent.sum()),
+            "keys_failed": int((outcomes == gx.KEY_FAILED).sum()),
+            "keys_dropped": int((outcomes == gx.KEY_DROPPED).sum()),
+            # Capture to detection done on the firing frame: processing time, not how long the motion took
+            "process_ms": (log["times"][fired, 1] - capture[fired]) * 1000 if live else np.zeros(0),
+            # Replays have no real send time
+            "keypress_ms": (key_times[sent, 1] - key_times[sent, 0]) * 1000 if live else np.zeros(0)
+        }
+
+        cooldown = metadata.get("cooldowns", {}).get(name)
+        for i in fired:
+            events.append((capture[i] - start, name, "fired"))
+        for begin, end in suppressed:
+            previous = fired[fired < begin]
+            since = f", {capture[begin] - capture[previous[-1]]:.2f}s after the last one" if len(previous) else ""
+            limit = f" of {cooldown:.2f}s" if cooldown is not None else ""
+            events.append((capture[begin] - start, name,
+                           f"suppressed by cooldown{limit}{since} ({end - begin} frames)"))
+        for i, peak in near_misses:
+            events.append((capture[i] - start, name, f"near miss, peaked at {peak:.0%} of threshold"))
+        for (capture_time, sent_time), outcome in zip(key_times, outcomes):
+            if outcome != gx.KEY_SENT:
+                events.append((capture_time - start, name, f"key {OUTCOME_NAMES[outcome]}"))
+            elif live and sent_time - capture_time > 0.1:
+                events.append((capture_time - start, name, f"key sent late, {(sent_time - capture_time) * 1000:.0f} ms"))
+
+    for begin, end in runs(log["status"] == gx.LOG_LOST):
+        events.append((capture[begin] - start, "-", f"pose lost ({capture[end - 1] - capture[begin]:.2f}s)"))
+    if len(capture) > 2:
+        intervals = np.diff(capture)
+        for i in np.flatnonzero(intervals > 3 * np.median(intervals)):
+            events.append((capture[i] - start, "-", f"no pose for {intervals[i]:.2f}s"))
+    events.sort(key=lambda event: event[0])
+    return gestures, events
+
+
+def print_report(log, gestures):
+    """Key columns read n/a when nothing recorded key results, rather than blaming key output"""
+    metadata = log["metadata"]
+    keys_logged = metadata["keys_logged"] > 0 or not any(stats["fired"] for stats in gestures.values())
+    live = metadata.get("source") != "replay"
+    capture = log["times"][:, 0]
+    status = log["status"]
+    frames = len(status)
+    duration = capture[-1] - capture[0] if frames > 1 else 0.0
+    print(f"{metadata.get('source', '?')} session dumped {metadata['dumped']}: {frames} frames "
+          f"over {duration:.1f}s ({metadata['frames_logged'] - frames} older frames overwritten)")
+    if frames:
+        print(f"detecting {np.mean(status == gx.LOG_DETECTING):.0%} | "
+              f"calibrating {np.mean(status == gx.LOG_CALIBRATING):.0%} | "
+              f"pose lost {np.mean(status == gx.LOG_LOST):.0%}")
+    print(f"{'gesture':<8}{'fired':>7}{'supp.':>7}{'blocked':>9}{'near':>6}"
+          f"{'sent':>6}{'failed':>8}{'dropped':>9}{'proc. ms':>11}{'key ms':>10}")
+    for name, stats in gestures.items():
+        if keys_logged:
+            keys = f"{stats['keys_sent']:>6}{stats['keys_failed']:>8}{stats['keys_dropped']:>9}"
+        else:
+            keys = f"{'n/a':>6}{'n/a':>8}{'n/a':>9}"
+        print(f"{name:<8}{stats['fired']:>7}{stats['suppressed']:>7}{stats['blocked_frames']:>9}"
+              f"{stats['near_misses']:>6}{keys}"
+              f"{percentiles(stats['process_ms']) if live else 'n/a':>11}"
+              f"{percentiles(stats['keypress_ms']) if live else 'n/a':>10}")
+    print("supp. = triggers suppressed by cooldown, blocked = frames they were held back, "
+          "near = near misses; proc. = capture to detection on the firing frame, "
+          "key = capture to key sent (p50/p95)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report on a GestureX session log dump")
+    parser.add_argument("log", help="session log (.npz) written with F9, SIGUSR1 or --session-log")
+    parser.add_argument("--events", action="store_true", help="print the timeline of triggers and problems")
+    parser.add_argument("--gesture", help="only show events of this gesture")
+    parser.add_argument("--around", type=float, metavar="SECONDS",
+                        help="only show events near this time (seconds since the first logged frame)")
+    parser.add_argument("--window", type=float, default=3.0, help="seconds either side of --around")
+    parser.add_argument("--near", type=float, default=0.8,
+                        help="progress (fraction of the threshold) that counts as a near miss")
+    args = parser.parse_args(argv)
+
+    log = load_session_log(args.log)
+    gestures, events = analyze(log, near=args.near)
+    print_report(log, gestures)
+
+    if args.events or args.around is not None:
+        print()
+        for t, gesture, text in events:
+            if args.gesture and gesture not in (args.gesture, "-"):
+                continue
+            if args.around is not None and abs(t - args.around) > args.window:
+                continue
+            print(f"{t:9.2f}s  {gesture:<6} {text}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+GestureX Threshold Tuning
+Replays labeled landmark recordings through detect_gesture for many threshold settings in parallel
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import GestureX as gx
+
+# Search ranges, the same as the sliders in the app
+PARAMETER_RANGES = {
+    "jump_threshold": (0.05, 0.30),
+    "slide_single_hand_threshold": (0.05, 0.25),
+    "slide_body_angle": (10, 45),
+    "tilt_sensitivity": (0.03, 0.15),
+    "cooldown_time": (0.3, 1.0)
+}
+REPORT_COLUMNS = {
+    "jump_threshold": "jump",
+    "slide_single_hand_threshold": "slide_hand",
+    "slide_body_angle": "bend_deg",
+    "tilt_sensitivity": "tilt",
+    "cooldown_time": "cooldown"
+}
+
+# Per-worker replay data, loaded once by init_worker
+DATASET = []
+RULES = None
+PREDICTIVE = False
+
+
+def labels_path_for(recording):
+    return os.path.splitext(recording)[0] + ".labels.csv"
+
+
+def load_labels(path):
+    """Read `timestamp,gesture[,...]` lines; a --key-output record file works as-is"""
+    labels = []
+    with open(path) as f:
+        for line in f:
+            fields = [field.strip() for field in line.split(",")]
+            if len(fields) < 2 or line.startswith("#"):
+                continue
+            try:
+                labels.append((float(fields[0]), fields[1]))
+            except ValueError:
+                continue  # header row
+    labels.sort()
+    return labels
+
+
+def load_recording(path, labels_path):
+    """Landmark objects per frame (None without a pose), timestamps and ground-truth labels"""
+    landmarks, timestamps = gx.load_landmark_stream(path)
+    frames = [None if np.isnan(frame[0, 0]) else gx.landmarks_from_array(frame) for frame in landmarks]
+    return os.path.basename(path), frames, np.asarray(timestamps, dtype=np.float64), load_labels(labels_path)
+
+
+def init_worker(recordings, rules, predictive):
+    global DATASET, RULES, PREDICTIVE
+    DATASET = [load_recording(path, labels) for path, labels in recordings]
+    RULES = rules
+    PREDICTIVE = predictive
+
+
+def replay(frames, timestamps, config):
+    """Fired (timestamp, gesture) events for one recording under one configuration"""
+    sink = gx.RecordingSink()
+    rules = gx.GestureRuleEngine.from_dict(RULES) if RULES else None
+    detector = gx.GestureDetector(key_sink=sink, rules=rules, predictive=PREDICTIVE)
+    detector.apply_parameters(config)
+    for landmarks, timestamp in zip(frames, timestamps):
+        if landmarks is not None:
+            detector.detect_gesture(landmarks, float(timestamp))
+    return [(timestamp, gesture) for timestamp, gesture, _ in sink.events]
+
+
+def match_events(events, labels, early, late):
+    """Match each label to the first unused event of the same gesture within [-early, +late] s
+
+    Returns (latencies of matched labels, missed labels, unmatched events).
+    """
+    used = [False] * len(events)
+    latencies = []
+    missed = 0
+    for label_time, gesture in labels:
+        for i, (event_time, event_gesture) in enumerate(events):
+            if used[i] or event_gesture != gesture:
+                continue
+            if label_time - early <= event_time <= label_time + late:
+                used[i] = True
+                latencies.append(event_time - label_time)
+                break
+        else:
+            missed += 1
+    return latencies, missed, used.count(False)
+
+
+def evaluate(config, early=0.3, late=0.6):
+    """Replay every recording with one configuration and score it"""
+    latencies = []
+    missed = false_triggers = 0
+    for _, frames, timestamps, labels in DATASET:
+        matched, misses, extra = match_events(replay(frames, timestamps, config), labels, early, late)
+        latencies += matched
+        missed += misses
+        false_triggers += extra
+
+    hits = len(latencies)
+    precision = hits / (hits + false_triggers) if hits + false_triggers else 0.0
+    recall = hits / (hits + missed) if hits + missed else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "parameters": config,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "hits": hits,
+        "missed": missed,
+        "false_triggers": false_triggers,
+        "latency_mean_ms": float(np.mean(latencies)) * 1000 if latencies else None,
+        "latency_p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else None
+    }
+
+
+def parse_grid(specs):
+    """--grid name=v1,v2,... values as {name: [values]}"""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in PARAMETER_RANGES:
+            raise ValueError(f"Unknown parameter {name!r}; tunable: {', '.join(PARAMETER_RANGES)}")
+        grid[name] = [float(v) for v in values.split(",") if v]
+    return grid
+
+
+def grid_configs(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_configs(count, names, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{name: round(float(rng.uniform(*PARAMETER_RANGES[name])), 4) for name in names}
+            for _ in range(count)]
+
+
+def rank_key(result):
+    """Best F1 first, then fewer false triggers, then lower latency"""
+    latency = result["latency_mean_ms"]
+    return (-result["f1"], result["false_triggers"], latency if latency is not None else float("inf"))
+
+
+def print_report(results, top):
+    names = list(PARAMETER_RANGES)
+    print("".join(f"{REPORT_COLUMNS[name]:>11}" for name in names) +
+          f"{'prec':>7}{'recall':>8}{'f1':>7}{'false':>7}{'lat ms':>8}{'p95 ms':>8}")
+    for result in results[:top]:
+        latency = result["latency_mean_ms"]
+        p95 = result["latency_p95_ms"]
+        print("".join(f"{result['parameters'][name]:>11.3f}" for name in names) +
+              f"{result['precision']:>7.2f}{result['recall']:>8.2f}{result['f1']:>7.2f}"
+              f"{result['false_triggers']:>7}"
+              f"{latency if latency is not None else float('nan'):>8.0f}"
+              f"{p95 if p95 is not None else float('nan'):>8.0f}")
+
+
+def export_profile(name, parameters):
+    """Write the tuned thresholds into a calibration profile, keeping any saved neutral pose"""
+    path = gx.calibration_profile_path(name)
+    profile = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            profile = json.load(f)
+    profile.setdefault("parameters", {}).update(parameters)
+    profile["tuned"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write then rename: an interrupted write must not lose the saved neutral pose
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(temp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune GestureX thresholds against labeled recordings")
+    parser.add_argument("recordings", nargs="+",
+                        help="landmark recordings (.gxl/.npy/.npz); labels are read from <name>.labels.csv "
+                             "or given as RECORDING:LABELS")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="grid values for one parameter (repeatable); others keep their defaults")
+    parser.add_argument("--random", type=int, default=0, metavar="N",
+                        help="evaluate N random configurations within the slider ranges")
+    parser.add_argument("--params", nargs="*", default=list(PARAMETER_RANGES),
+                        help="parameters varied by --random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rules", metavar="PATH", help="gesture rules file to tune instead of the built-in rules")
+    parser.add_argument("--predictive", action="store_true", help="tune with predictive triggering enabled")
+    parser.add_argument("--early", type=float, default=0.3,
+                        help="seconds a trigger may precede its label and still count")
+    parser.add_argument("--late", type=float, default=0.6,
+                        help="seconds a trigger may follow its label and still count")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--top", type=int, default=10, help="configurations to print")
+    parser.add_argument("--results", metavar="PATH", help="write every scored configuration to a JSON file")
+    parser.add_argument("--export-profile", metavar="NAME",
+                        help="store the best thresholds in a calibration profile (name or .json path)")
+    args = parser.parse_args(argv)
+
+    recordings = []
+    for spec in args.recordings:
+        path, _, labels = spec.partition(":") if not os.path.exists(spec) else (spec, "", "")
+        recordings.append((path, labels or labels_path_for(path)))
+
+    configs = grid_configs(parse_grid(args.grid)) if args.grid else []
+    if args.random:
+        unknown = set(args.params) - set(PARAMETER_RANGES)
+        if unknown:
+            parser.error(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        configs += random_configs(args.random, args.params, args.seed)
+    if not configs:
+        parser.error("nothing to evaluate: give --grid and/or --random")
+    rules = None
+    if args.rules:
+        rules = gx.read_config_file(args.rules)
+        gx.GestureRuleEngine.from_dict(rules)  # validate before starting workers
+    # Parameters a configuration leaves out keep the detector defaults, including those set by the rules file
+    detector = gx.GestureDetector(rules=gx.GestureRuleEngine.from_dict(rules) if rules else None)
+    defaults = {name: getattr(detector, name) for name in PARAMETER_RANGES}
+    configs = [dict(defaults, **config) for config in configs]
+
+    print(f"Evaluating {len(configs)} configurations on {len(recordings)} recordings "
+          f"with {args.workers} workers")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(recordings, rules, args.predictive)) as pool:
+        results = list(pool.map(evaluate, configs, itertools.repeat(args.early), itertools.repeat(args.late),
+                                chunksize=max(1, len(configs) // (4 * (args.workers or 1)))))
+    results.sort(key=rank_key)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    print_report(results, args.top)
+
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.results}")
+    if args.export_profile:
+        path = export_profile(args.export_profile, results[0]["parameters"])
+        print(f"Best thresholds saved to profile {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())